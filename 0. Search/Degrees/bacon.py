@@ -0,0 +1,131 @@
+"""
+"Bacon number" distributions: how many people lie at each degree of
+separation from a given person.
+
+Rather than one breadth-first search per source, up to 64 sources are
+searched in a single pass. Every person carries a 64-bit mask of the
+sources that have reached them, and each level moves whole masks from
+people to their movies and from movies to their stars, so a movie's cast
+is scanned once per level however many sources reach it.
+
+Usage: python bacon.py [directory] [--snapshot] (--sources ID ... | --top N)
+"""
+
+import argparse
+from array import array
+
+import degrees
+from graph import Graph
+from landmarks import choose_landmarks
+from snapshot import load_cached_graph
+
+# Sources searched together in one pass over the graph
+WIDTH = 64
+
+
+def bit_parallel_levels(graph, sources):
+    """
+    Runs one breadth-first search for each of up to WIDTH source person
+    indices at once. Yields (depth, reached) for every level, where
+    reached maps each person first reached at that depth to the mask of
+    sources that reached them.
+    """
+    if len(sources) > WIDTH:
+        raise ValueError(f"at most {WIDTH} sources per pass")
+
+    seen = array("Q", bytes(8 * graph.person_count()))
+    frontier = {}
+    for i, p in enumerate(sources):
+        frontier[p] = frontier.get(p, 0) | (1 << i)
+    for p, mask in frontier.items():
+        seen[p] = mask
+
+    depth = 0
+    while frontier:
+        yield depth, frontier
+        depth += 1
+
+        # Gather the sources reaching each movie through its stars
+        movie_masks = {}
+        for p, mask in frontier.items():
+            for m in graph.movies_of(p):
+                movie_masks[m] = movie_masks.get(m, 0) | mask
+
+        # Pass them on to every star who has not yet seen those sources
+        next_frontier = {}
+        for m, mask in movie_masks.items():
+            for q in graph.stars_of(m):
+                new = mask & ~seen[q]
+                if new:
+                    seen[q] |= new
+                    next_frontier[q] = next_frontier.get(q, 0) | new
+        frontier = next_frontier
+
+
+def distance_histograms(graph, sources):
+    """
+    Returns a list with one dict per source person index, mapping each
+    degree of separation to the number of people at that distance.
+    People who cannot be reached are counted under None.
+    """
+    histograms = []
+    for start in range(0, len(sources), WIDTH):
+        batch = sources[start:start + WIDTH]
+        counts = [{} for _ in batch]
+        reached = [0] * len(batch)
+        for depth, frontier in bit_parallel_levels(graph, batch):
+            for mask in frontier.values():
+                while mask:
+                    low = mask & -mask
+                    i = low.bit_length() - 1
+                    counts[i][depth] = counts[i].get(depth, 0) + 1
+                    reached[i] += 1
+                    mask ^= low
+        for histogram, total in zip(counts, reached):
+            unreachable = graph.person_count() - total
+            if unreachable:
+                histogram[None] = unreachable
+        histograms.extend(counts)
+    return histograms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument(
+        "--snapshot", action="store_true",
+        help="load the graph from its binary snapshot"
+    )
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--sources", metavar="ID", nargs="+",
+                       help="IMDB person ids to measure from")
+    group.add_argument("--top", metavar="N", type=int,
+                       help="measure from the N people with the most co-stars")
+    args = parser.parse_args()
+
+    if args.snapshot:
+        graph = load_cached_graph(args.directory)
+    else:
+        degrees.load_data(args.directory)
+        graph = Graph.from_dicts(degrees.people, degrees.movies)
+
+    if args.top is not None:
+        sources = choose_landmarks(graph, args.top)
+    else:
+        sources = []
+        for person_id in args.sources:
+            p = graph.person_index(person_id)
+            if p is None:
+                parser.error(f"unknown person id {person_id}")
+            sources.append(p)
+
+    for p, histogram in zip(sources, distance_histograms(graph, sources)):
+        print(f"{graph.person_names[p]} ({graph.person_ids[p]})")
+        for depth in sorted(d for d in histogram if d is not None):
+            print(f"    {depth}: {histogram[depth]}")
+        if None in histogram:
+            print(f"    not connected: {histogram[None]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Batch scoring of (source, target) person id pairs.
+
+Each input line holds a source and a target IMDB person id separated by
+whitespace. Each output line, in input order, is
+
+    degrees<TAB>movie_id:person_id,movie_id:person_id,...
+
+with degrees -1 and an empty path when the pair is not connected or
+either id is unknown. Lines that are not a pair of ids are also scored
+-1, with a note on stderr, so one bad line does not stop the batch.
+
+Workers share the loaded Graph instead of reloading it. Where the
+platform can fork, children inherit the parent's graph; otherwise each
+worker memory-maps the same snapshot file, so the operating system
+shares its pages between them.
+"""
+
+import multiprocessing
+import sys
+
+from landmarks import load_landmarks
+from snapshot import load_snapshot
+
+# Graph searched by this process, inherited or mapped by pool workers,
+# and the landmark index used to prune searches, if any
+_graph = None
+_landmarks = None
+
+# Pairs sent to a worker at a time, to amortise inter-process overhead
+CHUNKSIZE = 256
+
+
+def format_path(path):
+    """
+    Returns the output line for a path found by Graph.shortest_path.
+    """
+    if path is None:
+        return "-1\t"
+    steps = ",".join(f"{movie_id}:{person_id}" for movie_id, person_id in path)
+    return f"{len(path)}\t{steps}"
+
+
+def find_path(source, target):
+    """
+    Returns the shortest path between two IMDB person ids in the shared
+    graph, or None if they are not connected or either id is unknown.
+    """
+    for person_id in (source, target):
+        if _graph.person_index(person_id) is None:
+            return None
+    if _landmarks is not None:
+        return _landmarks.shortest_path(_graph, source, target)
+    return _graph.shortest_path(source, target)
+
+
+def score(numbered):
+    """
+    Returns the output line for one (line number, input line) pair.
+    """
+    number, line = numbered
+    fields = line.split()
+    if len(fields) != 2:
+        print(f"line {number}: expected a source and a target id, "
+              f"got {line.strip()!r}", file=sys.stderr)
+        return format_path(None)
+    source, target = fields
+    return format_path(find_path(source, target))
+
+
+def _init_worker(snapshot, landmarks):
+    global _graph, _landmarks
+    if snapshot is not None:
+        _graph = load_snapshot(snapshot)
+    if landmarks is not None:
+        _landmarks = load_landmarks(_graph, landmarks)
+
+
+def share(graph, index=None):
+    """
+    Makes graph, and the LandmarkIndex index if given, the ones searched
+    by find_path in this process and in workers forked from it.
+    """
+    global _graph, _landmarks
+    _graph = graph
+    _landmarks = index
+
+
+def pool_options(snapshot=None, index_path=None):
+    """
+    Returns (context, initializer, initargs) for starting workers that
+    search the shared graph.
+
+    snapshot and index_path are the files the shared graph and index
+    were loaded from, which workers map when they cannot inherit them by
+    forking.
+    """
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork"), _init_worker, (None, None)
+    if snapshot is None or (_landmarks is not None and index_path is None):
+        raise ValueError("workers need fork or a snapshot to share the graph")
+    return multiprocessing.get_context(), _init_worker, (snapshot, index_path)
+
+
+def run_batch(graph, lines, output, workers=None, snapshot=None,
+              index=None, index_path=None):
+    """
+    Scores every pair in lines with graph, writing one line per pair to
+    output as results arrive, in input order. Searches are pruned by the
+    LandmarkIndex index if one is given.
+    """
+    share(graph, index)
+    lines = ((number, line) for number, line in enumerate(lines, 1)
+             if line.strip())
+
+    if workers == 1:
+        for numbered in lines:
+            print(score(numbered), file=output)
+        return
+
+    context, initializer, initargs = pool_options(snapshot, index_path)
+    with context.Pool(workers, initializer=initializer,
+                      initargs=initargs) as pool:
+        for result in pool.imap(score, lines, chunksize=CHUNKSIZE):
+            print(result, file=output)
@@ -0,0 +1,476 @@
+"""
+Benchmarks for the Degrees search.
+
+Usage: python benchmark.py search [directory] [--pairs N] [--seed S]
+       python benchmark.py frontier [--sizes N ...]
+       python benchmark.py csr [directory] [--pairs N] [--seed S]
+       python benchmark.py snapshot [directory]
+       python benchmark.py landmarks [directory] [--landmarks K] [--pairs N]
+       python benchmark.py generate directory [--people N] [--movies N]
+       python benchmark.py suite [directory] [--pairs N] [--output FILE]
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import degrees
+from graph import load_graph
+from landmarks import LandmarkIndex
+from snapshot import (load_cached_graph, load_snapshot, save_snapshot,
+                      snapshot_path, source_stats)
+from util import Node, StackFrontier, QueueFrontier
+
+
+def count_expansions():
+    """
+    Wraps degrees.neighbors_for_person so that every call is counted.
+    Returns a dict whose "expanded" entry holds the running count, and
+    a function that restores the original neighbors_for_person.
+    """
+    original = degrees.neighbors_for_person
+    counter = {"expanded": 0}
+
+    def counted(person_id):
+        counter["expanded"] += 1
+        return original(person_id)
+
+    def restore():
+        degrees.neighbors_for_person = original
+
+    degrees.neighbors_for_person = counted
+    return counter, restore
+
+
+def random_pairs(people, count, seed):
+    """
+    Returns count random (source, target) pairs of person_ids.
+    """
+    rng = random.Random(seed)
+    person_ids = sorted(people)
+    return [(rng.choice(person_ids), rng.choice(person_ids))
+            for _ in range(count)]
+
+
+def run_search(search, pairs):
+    """
+    Runs search over every pair, returning the paths found, the total
+    number of people expanded and the elapsed wall time.
+    """
+    counter, restore = count_expansions()
+    try:
+        start = time.perf_counter()
+        paths = [search(source, target) for source, target in pairs]
+        elapsed = time.perf_counter() - start
+    finally:
+        restore()
+    return paths, counter["expanded"], elapsed
+
+
+def bench_search(args):
+    """
+    Compares breadth-first and bidirectional search on random pairs.
+    """
+    degrees.load_data(args.directory)
+    pairs = random_pairs(degrees.people, args.pairs, args.seed)
+
+    results = {}
+    for name, search in [
+        ("bfs", degrees.shortest_path),
+        ("bidirectional", degrees.bidirectional_shortest_path)
+    ]:
+        results[name] = run_search(search, pairs)
+        _, expanded, elapsed = results[name]
+        print(f"{name:>14}: {expanded:>10} expanded  {elapsed:8.3f}s")
+
+    # Both searches must agree on the degrees of separation
+    for (source, target), a, b in zip(
+        pairs, results["bfs"][0], results["bidirectional"][0]
+    ):
+        if (a is None) != (b is None) or (a is not None and len(a) != len(b)):
+            raise Exception(f"searches disagree for {source} -> {target}")
+
+
+def bench_frontier(args):
+    """
+    Times add, contains_state and remove on frontiers of each size.
+    """
+    for size in args.sizes:
+        for name, frontier_class in [
+            ("stack", StackFrontier),
+            ("queue", QueueFrontier)
+        ]:
+            frontier = frontier_class()
+            nodes = [Node(state=i, parent=None, action=None)
+                     for i in range(size)]
+
+            start = time.perf_counter()
+            for node in nodes:
+                frontier.add(node)
+            added = time.perf_counter()
+            for state in range(0, 2 * size, 2):
+                frontier.contains_state(state)
+            checked = time.perf_counter()
+            while not frontier.empty():
+                frontier.remove()
+            removed = time.perf_counter()
+
+            print(f"{name:>5} {size:>9}: "
+                  f"add {added - start:7.3f}s  "
+                  f"contains {checked - added:7.3f}s  "
+                  f"remove {removed - checked:7.3f}s")
+
+
+def bench_csr(args):
+    """
+    Checks the CSR graph against the dict backend and compares load
+    and search times.
+    """
+    start = time.perf_counter()
+    degrees.load_data(args.directory)
+    print(f"dict load: {time.perf_counter() - start:8.3f}s")
+    start = time.perf_counter()
+    graph = load_graph(args.directory)
+    print(f" csr load: {time.perf_counter() - start:8.3f}s")
+
+    pairs = random_pairs(degrees.people, args.pairs, args.seed)
+
+    # Neighbors must match exactly for every person sampled
+    for source, _ in pairs:
+        if (graph.neighbors_for_person(source)
+                != degrees.neighbors_for_person(source)):
+            raise Exception(f"neighbors disagree for {source}")
+
+    start = time.perf_counter()
+    expected = [degrees.bidirectional_shortest_path(source, target)
+                for source, target in pairs]
+    print(f"dict search: {time.perf_counter() - start:8.3f}s")
+    start = time.perf_counter()
+    paths = [graph.shortest_path(source, target) for source, target in pairs]
+    print(f" csr search: {time.perf_counter() - start:8.3f}s")
+
+    for (source, target), a, b in zip(pairs, expected, paths):
+        if (a is None) != (b is None) or (a is not None and len(a) != len(b)):
+            raise Exception(f"backends disagree for {source} -> {target}")
+        if b is not None:
+            # Every step of the CSR path must be a real co-starring
+            previous = source
+            for movie_id, person_id in b:
+                if (movie_id, person_id) not in degrees.neighbors_for_person(
+                    previous
+                ):
+                    raise Exception(f"invalid step {previous} -> {person_id}")
+                previous = person_id
+
+
+def bench_snapshot(args):
+    """
+    Compares parsing the CSV files with loading a snapshot of them.
+    """
+    start = time.perf_counter()
+    graph = load_graph(args.directory)
+    print(f"     csv load: {time.perf_counter() - start:8.3f}s")
+
+    path = snapshot_path(args.directory)
+    start = time.perf_counter()
+    save_snapshot(graph, path, source_stats(args.directory))
+    print(f"snapshot save: {time.perf_counter() - start:8.3f}s  "
+          f"({os.path.getsize(path)} bytes)")
+
+    start = time.perf_counter()
+    cached = load_snapshot(path)
+    print(f"snapshot load: {time.perf_counter() - start:8.3f}s")
+
+    # The first search touches the mapped pages, so time it separately
+    source = graph.person_ids[0]
+    target = graph.person_ids[graph.person_count() - 1]
+    start = time.perf_counter()
+    if cached.shortest_path(source, target) != graph.shortest_path(
+        source, target
+    ):
+        raise Exception("snapshot search disagrees with the CSV graph")
+    print(f" first search: {time.perf_counter() - start:8.3f}s")
+
+
+def bench_landmarks(args):
+    """
+    Times building a landmark index and compares searches pruned by it
+    with plain graph searches.
+    """
+    graph = load_graph(args.directory)
+    start = time.perf_counter()
+    index = LandmarkIndex.build(graph, args.landmarks)
+    print(f"build: {time.perf_counter() - start:8.3f}s  "
+          f"({index.nbytes()} bytes for {args.landmarks} landmarks)")
+
+    rng = random.Random(args.seed)
+    pairs = [(graph.person_ids[rng.randrange(graph.person_count())],
+              graph.person_ids[rng.randrange(graph.person_count())])
+             for _ in range(args.pairs)]
+
+    start = time.perf_counter()
+    estimates = [index.estimate(graph, source, target)
+                 for source, target in pairs]
+    elapsed = time.perf_counter() - start
+    print(f"estimate: {elapsed / len(pairs) * 1e6:8.1f}us per pair")
+
+    start = time.perf_counter()
+    expected = [graph.shortest_path(source, target)
+                for source, target in pairs]
+    plain = time.perf_counter() - start
+    start = time.perf_counter()
+    paths = [index.shortest_path(graph, source, target)
+             for source, target in pairs]
+    pruned = time.perf_counter() - start
+    print(f"search: {plain:8.3f}s plain  {pruned:8.3f}s pruned  "
+          f"({plain / pruned:.1f}x)")
+
+    for (source, target), a, b, bounds in zip(
+        pairs, expected, paths, estimates
+    ):
+        if (a is None) != (b is None) or (a is not None and len(a) != len(b)):
+            raise Exception(f"searches disagree for {source} -> {target}")
+        if a is None:
+            continue
+        lower, upper = bounds
+        if len(a) < lower or (upper is not None and len(a) > upper):
+            raise Exception(f"bounds miss distance for {source} -> {target}")
+
+
+def generate_dataset(directory, people, movies, seed=0, alpha=1.5,
+                     min_cast=3, max_cast=200, zipf=0.8):
+    """
+    Writes people.csv, movies.csv and stars.csv for a synthetic dataset.
+
+    Cast sizes follow a Pareto distribution with shape alpha starting
+    at min_cast, so most movies have a handful of stars and a few have
+    very many, and stars are drawn with Zipf weights of exponent zipf,
+    so a few prolific people appear in many movies. Names repeat, to
+    exercise disambiguation.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+
+    with open(f"{directory}/people.csv", "w", encoding="utf-8",
+              newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for i in range(people):
+            birth = str(rng.randrange(1900, 2010)) if rng.random() < 0.9 else ""
+            writer.writerow([str(i + 1), f"Person {rng.randrange(people)}",
+                             birth])
+
+    with open(f"{directory}/movies.csv", "w", encoding="utf-8",
+              newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for i in range(movies):
+            writer.writerow([str(i + 1), f"Movie {i + 1}",
+                             str(rng.randrange(1920, 2025))])
+
+    # Popularity by rank, shuffled so ids say nothing about popularity
+    ranks = list(range(1, people + 1))
+    rng.shuffle(ranks)
+    weights = list(itertools.accumulate(rank ** -zipf for rank in ranks))
+
+    with open(f"{directory}/stars.csv", "w", encoding="utf-8",
+              newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for movie in range(movies):
+            cast = min(int(min_cast * rng.paretovariate(alpha)), max_cast,
+                       people)
+            stars = set(rng.choices(range(people), cum_weights=weights,
+                                    k=cast))
+            for person in stars:
+                writer.writerow([str(person + 1), str(movie + 1)])
+
+
+def bench_generate(args):
+    """
+    Writes a synthetic dataset.
+    """
+    generate_dataset(args.directory, args.people, args.movies, args.seed,
+                     args.alpha)
+
+
+def peak_rss():
+    """
+    Returns the peak resident memory of this process in bytes, or None
+    where the platform cannot report it.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def percentiles(samples):
+    """
+    Summarises latencies in seconds as milliseconds.
+    """
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p50_ms": cuts[49] * 1000,
+        "p90_ms": cuts[89] * 1000,
+        "p99_ms": cuts[98] * 1000,
+        "max_ms": max(samples) * 1000
+    }
+
+
+def measure(backend, directory, pairs, seed):
+    """
+    Loads directory with one backend and times queries on random pairs.
+    Runs in a fresh process, so peak memory belongs to this backend.
+    """
+    rss_before = peak_rss()
+    start = time.perf_counter()
+    if backend == "dict":
+        degrees.load_data(directory)
+        person_ids = list(degrees.people)
+        search = degrees.bidirectional_shortest_path
+    else:
+        if backend == "csr":
+            graph = load_graph(directory)
+        else:
+            graph = load_cached_graph(directory)
+        person_ids = graph.person_ids
+        search = graph.shortest_path
+    load = time.perf_counter() - start
+    rss_after = peak_rss()
+
+    rng = random.Random(seed)
+    latencies = []
+    connected = 0
+    for _ in range(pairs):
+        source = person_ids[rng.randrange(len(person_ids))]
+        target = person_ids[rng.randrange(len(person_ids))]
+        start = time.perf_counter()
+        path = search(source, target)
+        latencies.append(time.perf_counter() - start)
+        connected += path is not None
+
+    result = {
+        "load_s": load,
+        "peak_rss_bytes": rss_after,
+        "load_rss_bytes": (None if rss_after is None
+                           else rss_after - rss_before),
+        "connected": connected,
+        "queries": percentiles(latencies)
+    }
+    return result
+
+
+def bench_suite(args):
+    """
+    Measures every backend on a dataset and writes the results as JSON,
+    generating the dataset first if it does not exist.
+    """
+    if not os.path.exists(f"{args.directory}/stars.csv"):
+        generate_dataset(args.directory, args.people, args.movies,
+                         args.seed, args.alpha)
+
+    # Build the snapshot up front so the snapshot backend times a warm load
+    load_cached_graph(args.directory)
+
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    for backend in args.backends:
+        with ProcessPoolExecutor(1, mp_context=context) as executor:
+            results[backend] = executor.submit(
+                measure, backend, args.directory, args.pairs, args.seed
+            ).result()
+        queries = results[backend]["queries"]
+        print(f"{backend:>8}: load {results[backend]['load_s']:8.3f}s  "
+              f"p50 {queries['p50_ms']:8.3f}ms  "
+              f"p99 {queries['p99_ms']:8.3f}ms", file=sys.stderr)
+
+    report = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "dataset": {
+            "directory": args.directory,
+            "files": source_stats(args.directory)
+        },
+        "pairs": args.pairs,
+        "seed": args.seed,
+        "results": results
+    }
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    search = commands.add_parser("search", help="compare search strategies")
+    search.add_argument("directory", nargs="?", default="large")
+    search.add_argument("--pairs", type=int, default=100)
+    search.add_argument("--seed", type=int, default=0)
+    search.set_defaults(run=bench_search)
+
+    frontier = commands.add_parser("frontier", help="time frontier operations")
+    frontier.add_argument("--sizes", type=int, nargs="+",
+                          default=[10 ** 5, 10 ** 6])
+    frontier.set_defaults(run=bench_frontier)
+
+    csr = commands.add_parser("csr", help="check and time the CSR graph")
+    csr.add_argument("directory", nargs="?", default="large")
+    csr.add_argument("--pairs", type=int, default=100)
+    csr.add_argument("--seed", type=int, default=0)
+    csr.set_defaults(run=bench_csr)
+
+    snapshot = commands.add_parser("snapshot", help="time snapshot loading")
+    snapshot.add_argument("directory", nargs="?", default="large")
+    snapshot.set_defaults(run=bench_snapshot)
+
+    landmarks = commands.add_parser("landmarks", help="time landmark index")
+    landmarks.add_argument("directory", nargs="?", default="large")
+    landmarks.add_argument("--landmarks", type=int, default=16)
+    landmarks.add_argument("--pairs", type=int, default=100)
+    landmarks.add_argument("--seed", type=int, default=0)
+    landmarks.set_defaults(run=bench_landmarks)
+
+    generate = commands.add_parser("generate", help="write a synthetic dataset")
+    generate.add_argument("directory")
+    suite = commands.add_parser("suite", help="measure every backend as JSON")
+    suite.add_argument("directory", nargs="?", default="synthetic")
+    suite.add_argument("--pairs", type=int, default=1000)
+    suite.add_argument("--backends", nargs="+",
+                       choices=["dict", "csr", "snapshot"],
+                       default=["dict", "csr", "snapshot"])
+    suite.add_argument("--output", metavar="FILE",
+                       help="write results to FILE instead of stdout")
+    for command in (generate, suite):
+        command.add_argument("--people", type=int, default=100000)
+        command.add_argument("--movies", type=int, default=50000)
+        command.add_argument("--alpha", type=float, default=1.5,
+                             help="Pareto shape of the cast sizes")
+        command.add_argument("--seed", type=int, default=0)
+    generate.set_defaults(run=bench_generate)
+    suite.set_defaults(run=bench_suite)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,16 @@
+import argparse
 import csv
 import sys
+from functools import partial
 from pprint import pprint
 
+from batch import run_batch
+from graph import NameIndex, bidirectional_search, load_graph, read_delta
+from landmarks import (landmarks_path, load_cached_landmarks,
+                       open_cached_landmarks, save_landmarks)
+from server import serve
+from snapshot import (apply_snapshot_delta, compact_snapshot,
+                      load_cached_graph, snapshot_path, source_stats)
 from util import Node, StackFrontier, QueueFrontier
 
 # Maps names to a set of corresponding person_ids
@@ -13,6 +22,10 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# The person_ids in people and a NameIndex over their names, built on first
+# use by candidates_for_name
+_name_index = None
+
 
 def load_data(directory):
     """
@@ -53,14 +66,151 @@ def load_data(directory):
                 pass
 
 
+def apply_delta(directory):
+    """
+    Add the people, movies and stars in a directory of delta CSV files
+    to the data already in memory. Any of the files may be missing, and
+    rows for people or movies already loaded are ignored.
+    """
+    new_people, new_movies, new_stars = read_delta(directory)
+    for person_id, name, birth in new_people:
+        if person_id in people:
+            continue
+        people[person_id] = {"name": name, "birth": birth, "movies": set()}
+        names.setdefault(name.lower(), set()).add(person_id)
+    for movie_id, title, year in new_movies:
+        if movie_id in movies:
+            continue
+        movies[movie_id] = {"title": title, "year": year, "stars": set()}
+    for person_id, movie_id in new_stars:
+        try:
+            people[person_id]["movies"].add(movie_id)
+            movies[movie_id]["stars"].add(person_id)
+        except KeyError:
+            pass
+
+
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(
+        description="Find the degrees of separation between two people."
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument(
+        "--snapshot", action="store_true",
+        help="search a compact graph cached in a binary snapshot"
+    )
+    parser.add_argument(
+        "--landmarks", metavar="K", type=int, default=0,
+        help="prune graph searches with a cached index of K landmarks"
+    )
+    parser.add_argument(
+        "--one-sided", action="store_true",
+        help="search the CSV files from the source only, not from both ends"
+    )
+    parser.add_argument(
+        "--batch", metavar="FILE", type=argparse.FileType("r"),
+        help="score source/target id pairs from FILE ('-' for stdin)"
+    )
+    parser.add_argument(
+        "--serve", metavar="ADDRESS",
+        help="serve JSON queries on unix:PATH, HOST:PORT or PORT"
+    )
+    parser.add_argument(
+        "--resolve", metavar="FILE", type=argparse.FileType("r"),
+        help="list the people matching each name in FILE ('-' for stdin)"
+    )
+    parser.add_argument(
+        "--prefix", action="store_true",
+        help="with --resolve, match names starting with each line"
+    )
+    parser.add_argument(
+        "--apply-delta", metavar="DELTA",
+        help="add the CSV files in DELTA to the snapshot, then exit"
+    )
+    parser.add_argument(
+        "--compact", action="store_true",
+        help="merge deltas applied so far into the snapshot, then exit"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="processes used by --batch and --serve (default: one per CPU)"
+    )
+    args = parser.parse_args()
+    directory = args.directory
+
+    if args.one_sided and (args.snapshot or args.landmarks
+                           or args.batch is not None
+                           or args.serve is not None
+                           or args.resolve is not None
+                           or args.apply_delta is not None
+                           or args.compact):
+        parser.error("--one-sided only applies to searching the CSV files "
+                     "interactively")
+
+    if args.apply_delta is not None or args.compact:
+        if not args.snapshot:
+            parser.error("--apply-delta and --compact need --snapshot")
+        graph = load_cached_graph(directory)
+        path = snapshot_path(directory)
+        if args.apply_delta is not None:
+            update_snapshot(graph, directory, args.apply_delta)
+        if args.compact:
+            compact_snapshot(graph, path, directory)
+        return
+
+    if args.resolve is not None:
+        if args.snapshot:
+            candidates = load_cached_graph(directory).candidates
+        else:
+            load_data(directory)
+            candidates = candidates_for_name
+        for line in args.resolve:
+            name = line.strip()
+            for person_id, match, birth in candidates(name, args.prefix):
+                print(f"{name}\t{person_id}\t{match}\t{birth}")
+        return
+
+    if args.batch is not None or args.serve is not None:
+        if args.snapshot:
+            graph = load_cached_graph(directory)
+            snapshot = snapshot_path(directory)
+        else:
+            graph = load_graph(directory)
+            snapshot = None
+        index = index_path = None
+        if args.landmarks:
+            index = load_cached_landmarks(graph, directory, args.landmarks)
+            index_path = landmarks_path(directory)
+        if args.batch is not None:
+            run_batch(graph, args.batch, sys.stdout, args.workers, snapshot,
+                      index, index_path)
+        else:
+            serve(graph, args.serve, args.workers, snapshot,
+                  index, index_path)
+        return
 
     # Load data from files into memory
     #print("Loading data...")
-    load_data(directory)
+    if args.snapshot or args.landmarks:
+        # The landmark index works on a Graph, so build one for it
+        if args.snapshot:
+            graph = load_cached_graph(directory)
+        else:
+            graph = load_graph(directory)
+        find_person = graph.person_ids_for_name
+        person, movie = graph.person, graph.movie
+        search = graph.shortest_path
+        if args.landmarks:
+            index = load_cached_landmarks(graph, directory, args.landmarks)
+            search = partial(index.shortest_path, graph)
+    else:
+        load_data(directory)
+        find_person = None
+        person, movie = people.__getitem__, movies.__getitem__
+        if args.one_sided:
+            search = shortest_path
+        else:
+            search = bidirectional_shortest_path
     # print("Data loaded.")
 
     # pprint(names)
@@ -70,14 +220,14 @@ def main():
     # pprint(movies)
 
     # return
-    source = person_id_for_name(input("Name: "))
+    source = person_id_for_name(input("Name: "), find_person, person)
     if source is None:
         sys.exit("Person not found.")
-    target = person_id_for_name(input("Name: "))
+    target = person_id_for_name(input("Name: "), find_person, person)
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = search(source, target)
 
     if path is None:
         print("Not connected.")
@@ -86,10 +236,25 @@ def main():
         print(f"{degrees} degrees of separation.")
         path = [(None, source)] + path
         for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
-            print(f"{i + 1}: {person1} and {person2} starred in {movie}")
+            person1 = person(path[i][1])["name"]
+            person2 = person(path[i + 1][1])["name"]
+            title = movie(path[i + 1][0])["title"]
+            print(f"{i + 1}: {person1} and {person2} starred in {title}")
+
+
+def update_snapshot(graph, directory, delta_directory):
+    """
+    Applies a delta to the snapshot of directory and to its landmark
+    index, if it has an up to date one.
+    """
+    # Check the index matches the graph before the delta changes it
+    index = open_cached_landmarks(graph, directory)
+    touched = apply_snapshot_delta(graph, snapshot_path(directory),
+                                   delta_directory)
+    if index is not None:
+        index.update(graph, touched)
+        save_landmarks(index, graph, landmarks_path(directory),
+                       source_stats(directory))
 
 
 def shortest_path(source, target):
@@ -141,20 +306,43 @@ def shortest_path(source, target):
     raise NotImplementedError
 
 
-def person_id_for_name(name):
+def bidirectional_shortest_path(source, target):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, searching from both ends.
+
+    One level of the smaller frontier is expanded at a time, and the
+    search stops as soon as it reaches a person already seen by the
+    other side. If no possible path, returns None.
+    """
+    return bidirectional_search(
+        source, target,
+        lambda person_id, forward: neighbors_for_person(person_id)
+    )
+
+
+def person_id_for_name(name, find_person=None, person=None):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
+
+    find_person and person default to looking the name and person up in
+    the loaded dicts, and can be swapped for a Graph's lookups.
     """
-    person_ids = list(names.get(name.lower(), set()))
+    if find_person is None:
+        person_ids = list(names.get(name.lower(), set()))
+    else:
+        person_ids = find_person(name)
+    if person is None:
+        person = people.__getitem__
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
         for person_id in person_ids:
-            person = people[person_id]
-            name = person["name"]
-            birth = person["birth"]
+            details = person(person_id)
+            name = details["name"]
+            birth = details["birth"]
             print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
         try:
             person_id = input("Intended Person ID: ")
@@ -167,6 +355,29 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def candidates_for_name(name, prefix=False):
+    """
+    Returns (person_id, name, birth) for every person with the given
+    name, or whose name starts with it if prefix is True, ignoring case.
+    Unlike person_id_for_name, never prompts.
+    """
+    global _name_index
+
+    # people only ever grows, so a change in size means the index is stale
+    if _name_index is None or len(_name_index[0]) != len(people):
+        person_ids = list(people)
+        _name_index = (
+            person_ids,
+            NameIndex([people[person_id]["name"] for person_id in person_ids])
+        )
+    person_ids, index = _name_index
+    candidates = []
+    for i in index.find(name, prefix):
+        person = people[person_ids[i]]
+        candidates.append((person_ids[i], person["name"], person["birth"]))
+    return candidates
+
+
 def neighbors_for_person(person_id):
     """
               action      state
@@ -0,0 +1,579 @@
+"""
+Compact integer-indexed graph of people and movies.
+
+People and movies are numbered 0..n-1 in load order. The movies of a
+person and the stars of a movie are held as CSR (compressed sparse row)
+arrays: the movies of person p are
+    person_movies[person_offsets[p]:person_offsets[p + 1]]
+and likewise for movie_offsets/movie_stars. Strings are packed into
+StringTables, and IMDB ids and names are found by binary search over
+sorted permutations of the people and movies, so no per-entry Python
+objects are kept.
+
+The arrays are never modified. People, movies and credits added later
+by apply_delta are kept in small dicts beside them until the graph is
+compacted into new arrays.
+"""
+
+import bisect
+import csv
+from array import array
+
+
+class StringTable():
+    """
+    Sequence of strings packed into one UTF-8 buffer, followed by any
+    strings appended since it was packed.
+    """
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+        self.packed = len(offsets) - 1
+        self.appended = []
+
+    @classmethod
+    def from_strings(cls, strings):
+        offsets = array("q", [0])
+        chunks = []
+        total = 0
+        for string in strings:
+            chunk = string.encode("utf-8")
+            chunks.append(chunk)
+            total += len(chunk)
+            offsets.append(total)
+        return cls(offsets, b"".join(chunks))
+
+    def __len__(self):
+        return self.packed + len(self.appended)
+
+    def __getitem__(self, i):
+        if i >= self.packed:
+            return self.appended[i - self.packed]
+        return str(self.data[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def append(self, string):
+        self.appended.append(string)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class NameIndex():
+    """
+    Case-insensitive lookup of names by exact match or prefix.
+
+    names is any sequence of names and order the permutation sorting
+    them by lowercase, so each lookup is two binary searches and the
+    index itself is a single array of integers.
+    """
+
+    def __init__(self, names, order=None):
+        if order is None:
+            order = sorted_order(names, key=str.lower)
+        self.names = names
+        self.order = order
+
+    def find(self, name, prefix=False):
+        """
+        Returns the positions in names of every name equal to name, or
+        starting with it if prefix is True, ignoring case.
+        """
+        name = name.lower()
+        order = self.order
+
+        def key(i):
+            return self.names[i].lower()
+
+        start = bisect.bisect_left(order, name, key=key)
+        if prefix:
+            # Every name with the prefix sorts below the prefix followed
+            # by the largest code point
+            end = bisect.bisect_left(order, name + "\U0010ffff", lo=start,
+                                     key=key)
+        else:
+            end = bisect.bisect_right(order, name, lo=start, key=key)
+        return [order[i] for i in range(start, end)]
+
+
+class Graph():
+
+    def __init__(self, person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 person_offsets, person_movies, movie_offsets, movie_stars,
+                 person_order=None, movie_order=None, name_order=None,
+                 deltas=0):
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.person_births = person_births
+        self.movie_ids = movie_ids
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_stars = movie_stars
+
+        # Permutations used for binary search by IMDB id and by name
+        if person_order is None:
+            person_order = sorted_order(person_ids)
+        if movie_order is None:
+            movie_order = sorted_order(movie_ids)
+        self.person_order = person_order
+        self.movie_order = movie_order
+        self.name_index = NameIndex(person_names, name_order)
+        self.name_order = self.name_index.order
+
+        # Everything added by apply_delta since the arrays were built:
+        # index lookups for new people, movies and names, and the extra
+        # movies of each person and stars of each movie
+        self.base_people = len(person_offsets) - 1
+        self.base_movies = len(movie_offsets) - 1
+        self.added_people = {}
+        self.added_movies = {}
+        self.added_names = {}
+        self.extra_movies = {}
+        self.extra_stars = {}
+
+        # Number of deltas applied since the CSV files were loaded
+        self.deltas = deltas
+
+    @classmethod
+    def from_dicts(cls, people, movies):
+        """
+        Builds a graph from the people and movies dicts of degrees.py.
+        """
+        person_ids = list(people)
+        movie_ids = list(movies)
+        person_index = {person_id: i for i, person_id in enumerate(person_ids)}
+        movie_index = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+
+        stars = []
+        for movie_id, movie in movies.items():
+            for person_id in movie["stars"]:
+                stars.append((person_index[person_id], movie_index[movie_id]))
+
+        return cls.from_stars(
+            person_ids,
+            [people[person_id]["name"] for person_id in person_ids],
+            [people[person_id]["birth"] for person_id in person_ids],
+            movie_ids,
+            [movies[movie_id]["title"] for movie_id in movie_ids],
+            [movies[movie_id]["year"] for movie_id in movie_ids],
+            stars
+        )
+
+    @classmethod
+    def from_stars(cls, person_ids, person_names, person_births,
+                   movie_ids, movie_titles, movie_years, stars):
+        """
+        Builds a graph from per-person and per-movie columns and a
+        collection of distinct (person, movie) index pairs.
+        """
+        person_offsets, person_movies = build_csr(
+            len(person_ids), ((p, m) for p, m in stars)
+        )
+        movie_offsets, movie_stars = build_csr(
+            len(movie_ids), ((m, p) for p, m in stars)
+        )
+        return cls(
+            StringTable.from_strings(person_ids),
+            StringTable.from_strings(person_names),
+            StringTable.from_strings(person_births),
+            StringTable.from_strings(movie_ids),
+            StringTable.from_strings(movie_titles),
+            StringTable.from_strings(movie_years),
+            person_offsets, person_movies, movie_offsets, movie_stars
+        )
+
+    def person_count(self):
+        return len(self.person_ids)
+
+    def movie_count(self):
+        return len(self.movie_ids)
+
+    def person_index(self, person_id):
+        """
+        Returns the index of an IMDB person id, or None if not present.
+        """
+        p = find(self.person_ids, self.person_order, person_id)
+        if p is None:
+            return self.added_people.get(person_id)
+        return p
+
+    def movie_index(self, movie_id):
+        """
+        Returns the index of an IMDB movie id, or None if not present.
+        """
+        m = find(self.movie_ids, self.movie_order, movie_id)
+        if m is None:
+            return self.added_movies.get(movie_id)
+        return m
+
+    def person_ids_for_name(self, name):
+        """
+        Returns the IMDB ids of every person with the given name,
+        ignoring case.
+        """
+        return [person_id for person_id, _, _ in self.candidates(name)]
+
+    def candidates(self, name, prefix=False):
+        """
+        Returns (person_id, name, birth) for every person with the given
+        name, or whose name starts with it if prefix is True, ignoring
+        case.
+        """
+        found = self.name_index.find(name, prefix)
+        name = name.lower()
+        for added, indices in self.added_names.items():
+            if added == name or (prefix and added.startswith(name)):
+                found.extend(indices)
+        return [(self.person_ids[p], self.person_names[p],
+                 self.person_births[p]) for p in found]
+
+    def person(self, person_id):
+        """
+        Returns the name and birth year of a person.
+        """
+        i = self.person_index(person_id)
+        return {"name": self.person_names[i], "birth": self.person_births[i]}
+
+    def movie(self, movie_id):
+        """
+        Returns the title and year of a movie.
+        """
+        i = self.movie_index(movie_id)
+        return {"title": self.movie_titles[i], "year": self.movie_years[i]}
+
+    def movies_of(self, p):
+        """
+        Returns the indices of the movies of the person at index p.
+        """
+        if p < self.base_people:
+            movies = self.person_movies[
+                self.person_offsets[p]:self.person_offsets[p + 1]
+            ]
+        else:
+            movies = ()
+        extra = self.extra_movies.get(p)
+        return movies if extra is None else list(movies) + extra
+
+    def stars_of(self, m):
+        """
+        Returns the indices of the stars of the movie at index m.
+        """
+        if m < self.base_movies:
+            stars = self.movie_stars[
+                self.movie_offsets[m]:self.movie_offsets[m + 1]
+            ]
+        else:
+            stars = ()
+        extra = self.extra_stars.get(m)
+        return stars if extra is None else list(stars) + extra
+
+    def neighbor_indices(self, p, expanded=None):
+        """
+        Yields (movie, person) index pairs for people who starred with
+        the person at index p.
+
+        If expanded is a set, movies already in it are skipped and the
+        rest are added to it. A search that has already reached every
+        star of a movie uses this to avoid scanning its cast again.
+        """
+        for m in self.movies_of(p):
+            if expanded is not None:
+                if m in expanded:
+                    continue
+                expanded.add(m)
+            for q in self.stars_of(m):
+                yield m, q
+
+    def neighbors_for_person(self, person_id):
+        """
+        Returns (movie_id, person_id) pairs for people
+        who starred with a given person.
+        """
+        return {
+            (self.movie_ids[m], self.person_ids[q])
+            for m, q in self.neighbor_indices(self.person_index(person_id))
+        }
+
+    def shortest_path(self, source, target):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the source to the target.
+
+        If no possible path, returns None.
+        """
+        path = self.shortest_index_path(
+            self.person_index(source), self.person_index(target)
+        )
+        if path is None:
+            return None
+        return [(self.movie_ids[m], self.person_ids[p]) for m, p in path]
+
+    def shortest_index_path(self, source, target, prune=None):
+        """
+        Bidirectional breadth-first search between two person indices,
+        returning a list of (movie, person) index pairs or None.
+
+        If given, prune(person, depth, forward) is called for each newly
+        reached person, with its distance from the side that reached it,
+        and the person is not expanded further if it returns True. It
+        must never prune a person on a shortest path.
+        """
+        # Movies whose whole cast each side has already reached
+        forward_movies = set()
+        backward_movies = set()
+
+        def neighbors(p, forward):
+            expanded = forward_movies if forward else backward_movies
+            return self.neighbor_indices(p, expanded)
+
+        return bidirectional_search(source, target, neighbors, prune)
+
+    def apply_delta(self, people, movies, stars):
+        """
+        Adds people as (id, name, birth) rows, movies as (id, title,
+        year) rows and stars as (person_id, movie_id) rows to the graph.
+        Rows for ids already present, and credits for unknown ids, are
+        ignored. Returns the set of indices of movies that gained stars.
+        """
+        for person_id, name, birth in people:
+            if self.person_index(person_id) is not None:
+                continue
+            p = self.person_count()
+            self.person_ids.append(person_id)
+            self.person_names.append(name)
+            self.person_births.append(birth)
+            self.added_people[person_id] = p
+            self.added_names.setdefault(name.lower(), []).append(p)
+
+        for movie_id, title, year in movies:
+            if self.movie_index(movie_id) is not None:
+                continue
+            m = self.movie_count()
+            self.movie_ids.append(movie_id)
+            self.movie_titles.append(title)
+            self.movie_years.append(year)
+            self.added_movies[movie_id] = m
+
+        touched = set()
+        for person_id, movie_id in stars:
+            p = self.person_index(person_id)
+            m = self.movie_index(movie_id)
+            if p is None or m is None or m in self.movies_of(p):
+                continue
+            self.extra_movies.setdefault(p, []).append(m)
+            self.extra_stars.setdefault(m, []).append(p)
+            touched.add(m)
+
+        self.deltas += 1
+        return touched
+
+    def is_compact(self):
+        """
+        Returns True if nothing has been added since the arrays were built.
+        """
+        return (not self.extra_movies
+                and self.person_count() == self.base_people
+                and self.movie_count() == self.base_movies)
+
+    def compact(self):
+        """
+        Returns a new graph holding everything in this one, with added
+        people, movies and credits merged into its arrays.
+        """
+        graph = Graph.from_stars(
+            list(self.person_ids), list(self.person_names),
+            list(self.person_births), list(self.movie_ids),
+            list(self.movie_titles), list(self.movie_years),
+            [(p, m) for p in range(self.person_count())
+             for m in self.movies_of(p)]
+        )
+        graph.deltas = self.deltas
+        return graph
+
+
+def bidirectional_search(source, target, neighbors, prune=None):
+    """
+    Bidirectional breadth-first search between two people, returning the
+    shortest list of (movie, person) pairs that connect the source to
+    the target, or None. People and movies may be ids or indices.
+
+    neighbors(person, forward) returns the (movie, person) pairs for the
+    people who starred with person, where forward is True for the side
+    searching from the source. prune is as for Graph.shortest_index_path.
+    """
+    if source == target:
+        return []
+
+    # Maps person to (movie, person) of the step that reached it, towards
+    # the source for the forward side and the target for the backward
+    forward = {source: None}
+    backward = {target: None}
+    forward_frontier = [source]
+    backward_frontier = [target]
+    forward_depth = backward_depth = 0
+
+    while forward_frontier and backward_frontier:
+
+        # Always grow the side with fewer people waiting to be expanded
+        if len(forward_frontier) <= len(backward_frontier):
+            frontier, seen, other = forward_frontier, forward, backward
+            forward_depth += 1
+            depth = forward_depth
+        else:
+            frontier, seen, other = backward_frontier, backward, forward
+            backward_depth += 1
+            depth = backward_depth
+
+        next_frontier = []
+        for p in frontier:
+            for m, q in neighbors(p, seen is forward):
+                if q in seen:
+                    continue
+                seen[q] = (m, p)
+                if q in other:
+                    return join_paths(forward, backward, q)
+                if prune is not None and prune(q, depth, seen is forward):
+                    continue
+                next_frontier.append(q)
+
+        if seen is forward:
+            forward_frontier = next_frontier
+        else:
+            backward_frontier = next_frontier
+
+    return None
+
+
+def join_paths(forward, backward, meeting):
+    """
+    Stitches the two halves of a bidirectional search together at the
+    person where they met.
+    """
+    path = []
+    p = meeting
+    while forward[p] is not None:
+        m, parent = forward[p]
+        path.append((m, p))
+        p = parent
+    path.reverse()
+
+    p = meeting
+    while backward[p] is not None:
+        m, child = backward[p]
+        path.append((m, child))
+        p = child
+    return path
+
+
+def build_csr(count, edges):
+    """
+    Returns (offsets, targets) arrays grouping (source, target) index
+    pairs by source, for sources numbered 0..count-1.
+    """
+    edges = list(edges)
+    offsets = array("q", bytes(8 * (count + 1)))
+    for source, _ in edges:
+        offsets[source + 1] += 1
+    for i in range(count):
+        offsets[i + 1] += offsets[i]
+
+    targets = array("i", bytes(4 * len(edges)))
+    fill = array("q", offsets[:-1])
+    for source, target in edges:
+        targets[fill[source]] = target
+        fill[source] += 1
+    return offsets, targets
+
+
+def sorted_order(table, key=None):
+    """
+    Returns the permutation of indices that sorts a StringTable.
+    """
+    if key is None:
+        values = list(table)
+    else:
+        values = [key(value) for value in table]
+    return array("i", sorted(range(len(values)), key=values.__getitem__))
+
+
+def find(table, order, value):
+    """
+    Binary searches a StringTable through its sorted order for value,
+    returning its index or None.
+    """
+    i = bisect.bisect_left(order, value, key=table.__getitem__)
+    if i < len(order) and table[order[i]] == value:
+        return order[i]
+    return None
+
+
+def load_graph(directory):
+    """
+    Load data from CSV files straight into a Graph.
+    """
+    person_ids, person_names, person_births = [], [], []
+    person_index = {}
+    with open(f"{directory}/people.csv", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            if row["id"] in person_index:
+                continue
+            person_index[row["id"]] = len(person_ids)
+            person_ids.append(row["id"])
+            person_names.append(row["name"])
+            person_births.append(row["birth"])
+
+    movie_ids, movie_titles, movie_years = [], [], []
+    movie_index = {}
+    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            if row["id"] in movie_index:
+                continue
+            movie_index[row["id"]] = len(movie_ids)
+            movie_ids.append(row["id"])
+            movie_titles.append(row["title"])
+            movie_years.append(row["year"])
+
+    # Stars rows may repeat, so keep the pairs distinct
+    stars = {}
+    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            try:
+                p = person_index[row["person_id"]]
+                m = movie_index[row["movie_id"]]
+            except KeyError:
+                continue
+            stars[(p, m)] = None
+
+    return Graph.from_stars(person_ids, person_names, person_births,
+                            movie_ids, movie_titles, movie_years, stars)
+
+
+def read_delta(directory):
+    """
+    Reads whichever of people.csv, movies.csv and stars.csv exist in a
+    delta directory. Returns (people, movies, stars) lists of rows in the
+    form taken by Graph.apply_delta.
+    """
+    columns = {
+        "people.csv": ["id", "name", "birth"],
+        "movies.csv": ["id", "title", "year"],
+        "stars.csv": ["person_id", "movie_id"]
+    }
+    rows = []
+    for name, fields in columns.items():
+        try:
+            with open(f"{directory}/{name}", encoding="utf-8") as f:
+                reader = csv.DictReader(f)
+                rows.append([[row[field] for field in fields]
+                             for row in reader])
+        except FileNotFoundError:
+            rows.append([])
+    return tuple(rows)
@@ -0,0 +1,265 @@
+"""
+Landmark distance oracle for degrees of separation.
+
+A breadth-first search is run once from each of a few well-connected
+landmark people, and the distance from every landmark to every person
+is stored. By the triangle inequality, for any landmark L
+
+    |d(L, a) - d(L, b)| <= d(a, b) <= d(L, a) + d(L, b)
+
+so taking the best bound over all landmarks gives an instant estimate
+for any pair, and lets an exact search skip people that cannot lie on
+a shortest path. A pair that a landmark reaches only one side of is
+not connected at all.
+
+Adding credits can only shorten distances, so after a delta the index
+is brought up to date by relaxing distances outward from the movies
+that gained stars, rather than searching from every landmark again.
+"""
+
+import heapq
+import os
+from array import array
+from collections import deque
+
+from snapshot import (is_fresh, map_sections, read_header, source_stats,
+                      write_sections)
+
+MAGIC = b"DEGLMKS\x01"
+INDEX_NAME = "degrees.landmarks"
+DEFAULT_LANDMARKS = 16
+
+# Landmarks consulted per search when pruning, as checking every one for
+# every person reached costs more than the pruning saves
+ACTIVE_LANDMARKS = 2
+
+# Distance stored for people a landmark cannot reach
+UNREACHABLE = -1
+
+
+def landmarks_path(directory):
+    return os.path.join(directory, INDEX_NAME)
+
+
+def choose_landmarks(graph, count):
+    """
+    Returns the indices of the count people with the most co-stars,
+    counted with repeats across movies.
+    """
+    def degree(p):
+        return sum(len(graph.stars_of(m)) for m in graph.movies_of(p))
+
+    return heapq.nlargest(count, range(graph.person_count()), key=degree)
+
+
+def distances_from(graph, source):
+    """
+    Returns an array of the distance from source to every person.
+    """
+    distances = array("h", [UNREACHABLE]) * graph.person_count()
+    distances[source] = 0
+    frontier = [source]
+    expanded = set()
+    depth = 0
+    while frontier:
+        depth += 1
+        next_frontier = []
+        for p in frontier:
+            for _, q in graph.neighbor_indices(p, expanded):
+                if distances[q] == UNREACHABLE:
+                    distances[q] = depth
+                    next_frontier.append(q)
+        frontier = next_frontier
+    return distances
+
+
+class LandmarkIndex():
+
+    def __init__(self, landmarks, distances):
+        self.landmarks = landmarks
+        self.distances = distances
+
+    @classmethod
+    def build(cls, graph, count=DEFAULT_LANDMARKS):
+        landmarks = choose_landmarks(graph, count)
+        return cls(landmarks, [distances_from(graph, p) for p in landmarks])
+
+    def bounds(self, p, q):
+        """
+        Returns (lower, upper) bounds on the distance between the people
+        at indices p and q, or None if they are known not to be
+        connected. upper is None if no landmark reaches them.
+        """
+        lower = 0
+        upper = None
+        for distances in self.distances:
+            a = distances[p]
+            b = distances[q]
+            if a == UNREACHABLE or b == UNREACHABLE:
+                if a != b:
+                    return None
+                continue
+            if abs(a - b) > lower:
+                lower = abs(a - b)
+            if upper is None or a + b < upper:
+                upper = a + b
+        return lower, upper
+
+    def update(self, graph, touched):
+        """
+        Brings the distances up to date after graph.apply_delta, given
+        the set of movies that gained stars.
+        """
+        for i, distances in enumerate(self.distances):
+            # Mapped distances are read-only, and new people need room
+            if not isinstance(distances, array):
+                distances = array("h", distances)
+            distances.extend(
+                [UNREACHABLE] * (graph.person_count() - len(distances))
+            )
+            self.distances[i] = distances
+
+            # Every star of a touched movie is now at most one step from
+            # its closest co-star
+            levels = {}
+            for m in touched:
+                stars = graph.stars_of(m)
+                reached = [distances[p] for p in stars
+                           if distances[p] != UNREACHABLE]
+                if not reached:
+                    continue
+                depth = min(reached) + 1
+                for p in stars:
+                    if distances[p] == UNREACHABLE or distances[p] > depth:
+                        distances[p] = depth
+                        levels.setdefault(depth, deque()).append(p)
+
+            # Relax outward in order of distance, as a breadth-first search
+            while levels:
+                depth = min(levels)
+                queue = levels.pop(depth)
+                while queue:
+                    p = queue.popleft()
+                    if distances[p] != depth:
+                        continue
+                    for _, q in graph.neighbor_indices(p):
+                        if (distances[q] == UNREACHABLE
+                                or distances[q] > depth + 1):
+                            distances[q] = depth + 1
+                            levels.setdefault(depth + 1, deque()).append(q)
+
+    def active(self, end, start, count=ACTIVE_LANDMARKS):
+        """
+        Returns (distances, distance to end) for the count landmarks
+        giving the best lower bound on the distance from start to end.
+        """
+        ranked = sorted(
+            (distances for distances in self.distances
+             if distances[end] != UNREACHABLE),
+            key=lambda distances: abs(distances[start] - distances[end]),
+            reverse=True
+        )
+        return [(distances, distances[end]) for distances in ranked[:count]]
+
+    def estimate(self, graph, source, target):
+        """
+        Returns (lower, upper) bounds on the degrees of separation
+        between two IMDB person ids, or None if they are not connected.
+        """
+        return self.bounds(graph.person_index(source),
+                           graph.person_index(target))
+
+    def shortest_path(self, graph, source, target):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the source to the target, searching only people
+        whose bounds allow them to be on a shortest path.
+
+        If no possible path, returns None.
+        """
+        p = graph.person_index(source)
+        q = graph.person_index(target)
+        bounds = self.bounds(p, q)
+        if bounds is None:
+            return None
+        _, upper = bounds
+
+        prune = None
+        if upper is not None:
+            # Only the landmarks that bound this pair best are consulted
+            forward = self.active(q, p)
+            backward = self.active(p, q)
+
+            def prune(r, depth, is_forward):
+                slack = upper - depth
+                for distances, end in (forward if is_forward else backward):
+                    d = distances[r]
+                    if d != UNREACHABLE and (d - end > slack or end - d > slack):
+                        return True
+                return False
+
+        path = graph.shortest_index_path(p, q, prune)
+        if path is None:
+            return None
+        return [(graph.movie_ids[m], graph.person_ids[r]) for m, r in path]
+
+    def nbytes(self):
+        return sum(memoryview(d).nbytes for d in self.distances)
+
+
+def save_landmarks(index, graph, path, sources):
+    """
+    Writes index to path, storing landmarks by IMDB person id.
+    """
+    header = {
+        "sources": sources,
+        "deltas": graph.deltas,
+        "landmarks": [graph.person_ids[p] for p in index.landmarks]
+    }
+    sections = [(f"distances.{i}", distances)
+                for i, distances in enumerate(index.distances)]
+    write_sections(path, MAGIC, header, sections)
+
+
+def load_landmarks(graph, path):
+    """
+    Memory-maps an index written by save_landmarks.
+    """
+    header, section = map_sections(path, MAGIC)
+    landmarks = [graph.person_index(person_id)
+                 for person_id in header["landmarks"]]
+    distances = [section(f"distances.{i}") for i in range(len(landmarks))]
+    return LandmarkIndex(landmarks, distances)
+
+
+def open_cached_landmarks(graph, directory):
+    """
+    Returns the landmark index saved next to the dataset in directory,
+    or None if it is missing, stale or lacks deltas applied to graph.
+    """
+    path = landmarks_path(directory)
+    if not is_fresh(path, directory, MAGIC):
+        return None
+    header, _ = read_header(path, MAGIC)
+    if header.get("deltas", 0) != graph.deltas:
+        return None
+    return load_landmarks(graph, path)
+
+
+def load_cached_landmarks(graph, directory, count=DEFAULT_LANDMARKS):
+    """
+    Returns the landmark index saved next to the dataset in directory,
+    building and saving a new one if open_cached_landmarks finds none
+    or it has a different number of landmarks.
+    """
+    index = open_cached_landmarks(graph, directory)
+    if index is not None and len(index.landmarks) == count:
+        return index
+
+    sources = source_stats(directory)
+    index = LandmarkIndex.build(graph, count)
+    try:
+        save_landmarks(index, graph, landmarks_path(directory), sources)
+    except OSError:
+        pass
+    return index
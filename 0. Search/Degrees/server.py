@@ -0,0 +1,195 @@
+"""
+Long-running query server for a loaded Degrees graph.
+
+The server listens on a Unix socket or TCP port and speaks line-delimited
+JSON. Each request is one JSON object on its own line, with an "op" and
+an optional "id" that is echoed back in the response:
+
+    {"id": 1, "op": "shortest_path", "source": "102", "target": "129"}
+    {"id": 2, "op": "person_id_for_name", "name": "kevin bac", "prefix": true}
+    {"id": 3, "op": "stats"}
+
+Each response is one JSON object on its own line, holding either a
+"result" or an "error", and the "latency_ms" of the request. Requests on
+one connection are answered as they complete, so a slow search does not
+hold up the lookups sent after it; match responses to requests by "id".
+
+Searches run in a pool of worker processes that share the graph, and
+name lookups and stats are answered directly on the event loop.
+"""
+
+import asyncio
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from batch import find_path, pool_options, share
+
+# Upper edges, in milliseconds, of the latency histogram buckets
+BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+
+class LatencyStats():
+    """
+    Counts requests and their latencies for each op.
+    """
+
+    def __init__(self):
+        self.ops = {}
+
+    def record(self, op, seconds):
+        ms = seconds * 1000
+        stats = self.ops.get(op)
+        if stats is None:
+            stats = self.ops[op] = {
+                "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                "buckets": [0] * (len(BUCKETS) + 1)
+            }
+        stats["count"] += 1
+        stats["total_ms"] += ms
+        stats["max_ms"] = max(stats["max_ms"], ms)
+        for i, edge in enumerate(BUCKETS):
+            if ms <= edge:
+                break
+        else:
+            i = len(BUCKETS)
+        stats["buckets"][i] += 1
+
+    def report(self):
+        """
+        Returns the counters of every op, with their mean latency and
+        histogram buckets labelled by upper edge in milliseconds.
+        """
+        report = {}
+        for op, stats in self.ops.items():
+            labels = [f"<={edge}" for edge in BUCKETS] + [f">{BUCKETS[-1]}"]
+            report[op] = {
+                "count": stats["count"],
+                "mean_ms": stats["total_ms"] / stats["count"],
+                "max_ms": stats["max_ms"],
+                "buckets": dict(zip(labels, stats["buckets"]))
+            }
+        return report
+
+
+class Server():
+
+    def __init__(self, graph, executor):
+        self.graph = graph
+        self.executor = executor
+        self.stats = LatencyStats()
+
+    async def handle(self, reader, writer):
+        """
+        Serves one connection until the client closes it. A request line
+        longer than the stream limit gets an error and ends the
+        connection, since the rest of it cannot be told apart from the
+        requests after it.
+        """
+        pending = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    self.stats.record("error", 0.0)
+                    await self.reply(writer, {
+                        "id": None, "error": "ValueError: request too long",
+                        "latency_ms": 0.0
+                    })
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                task = asyncio.create_task(self.respond(line, writer))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.wait(pending)
+        except ConnectionError:
+            # The client went away, so its answers have nowhere to go
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, line, writer):
+        start = time.perf_counter()
+        op = None
+        response = {}
+        try:
+            request = json.loads(line)
+            response["id"] = request.get("id")
+            op = request["op"]
+            response["result"] = await self.dispatch(op, request)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            response["error"] = f"{type(e).__name__}: {e}"
+        elapsed = time.perf_counter() - start
+        self.stats.record(op if "result" in response else "error", elapsed)
+        response["latency_ms"] = elapsed * 1000
+        await self.reply(writer, response)
+
+    async def reply(self, writer, response):
+        """
+        Writes one response line, unless the client has disconnected.
+        """
+        if writer.is_closing():
+            return
+        try:
+            writer.write(json.dumps(response).encode("utf-8") + b"\n")
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def dispatch(self, op, request):
+        if op == "shortest_path":
+            loop = asyncio.get_running_loop()
+            path = await loop.run_in_executor(
+                self.executor, find_path,
+                str(request["source"]), str(request["target"])
+            )
+            if path is None:
+                return {"degrees": None, "path": None}
+            return {"degrees": len(path), "path": path}
+        elif op == "person_id_for_name":
+            return [
+                {"id": person_id, "name": name, "birth": birth}
+                for person_id, name, birth in self.graph.candidates(
+                    str(request["name"]), bool(request.get("prefix"))
+                )
+            ]
+        elif op == "stats":
+            return self.stats.report()
+        raise ValueError(f"unknown op {op!r}")
+
+
+async def listen(server, address):
+    """
+    Serves forever on address, either "unix:PATH", "HOST:PORT" or "PORT".
+    """
+    if address.startswith("unix:"):
+        listener = await asyncio.start_unix_server(server.handle, address[5:])
+    else:
+        host, _, port = address.rpartition(":")
+        listener = await asyncio.start_server(
+            server.handle, host or "127.0.0.1", int(port)
+        )
+    async with listener:
+        await listener.serve_forever()
+
+
+def serve(graph, address, workers=None, snapshot=None,
+          index=None, index_path=None):
+    """
+    Serves queries against graph on address until interrupted. Searches
+    are pruned by the LandmarkIndex index if one is given.
+    """
+    share(graph, index)
+    context, initializer, initargs = pool_options(snapshot, index_path)
+    with ProcessPoolExecutor(workers, mp_context=context,
+                             initializer=initializer,
+                             initargs=initargs) as executor:
+        try:
+            asyncio.run(listen(Server(graph, executor), address))
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,233 @@
+"""
+Binary snapshots of a Graph, so the CSV files only need parsing once.
+
+A snapshot is a small JSON header followed by the raw bytes of every
+array and string table in the graph. Loading memory-maps the file and
+casts each section to a memoryview, so startup cost does not grow with
+the size of the dataset. The header records the size and modification
+time of each CSV file, and a snapshot whose CSVs have since changed is
+treated as stale and rebuilt.
+
+Deltas applied after the snapshot was written are appended to a journal
+beside it, one JSON line per delta, and replayed whenever the snapshot
+is loaded. compact_snapshot folds the journal back into the snapshot.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+
+from graph import Graph, StringTable, load_graph, read_delta
+
+MAGIC = b"DEGREES\x01"
+SNAPSHOT_NAME = "degrees.snapshot"
+SOURCES = ["people.csv", "movies.csv", "stars.csv"]
+
+# Graph attributes stored as string tables, then as plain arrays
+TABLES = ["person_ids", "person_names", "person_births",
+          "movie_ids", "movie_titles", "movie_years"]
+ARRAYS = ["person_offsets", "person_movies", "movie_offsets", "movie_stars",
+          "person_order", "movie_order", "name_order"]
+
+# Sections start on 8 byte boundaries so every array can be cast in place
+ALIGNMENT = 8
+
+
+def snapshot_path(directory):
+    return os.path.join(directory, SNAPSHOT_NAME)
+
+
+def journal_path(path):
+    return f"{path}.delta"
+
+
+def source_stats(directory):
+    """
+    Returns the size and modification time of each CSV file.
+    """
+    stats = {}
+    for name in SOURCES:
+        stat = os.stat(os.path.join(directory, name))
+        stats[name] = [stat.st_size, stat.st_mtime_ns]
+    return stats
+
+
+def save_snapshot(graph, path, sources):
+    """
+    Writes graph to path, recording sources as the CSV stats it was
+    loaded from. Deltas applied to graph are merged into the arrays.
+    """
+    if not graph.is_compact():
+        graph = graph.compact()
+
+    sections = []
+    for name in TABLES:
+        table = getattr(graph, name)
+        sections.append((f"{name}.offsets", table.offsets))
+        sections.append((f"{name}.data", table.data))
+    for name in ARRAYS:
+        sections.append((name, getattr(graph, name)))
+    header = {"sources": sources, "deltas": graph.deltas}
+    write_sections(path, MAGIC, header, sections)
+
+
+def load_snapshot(path):
+    """
+    Memory-maps a snapshot and returns the Graph it holds, with every
+    delta in its journal applied.
+    """
+    header, section = map_sections(path, MAGIC)
+    fields = {}
+    for name in TABLES:
+        fields[name] = StringTable(section(f"{name}.offsets"),
+                                   section(f"{name}.data"))
+    for name in ARRAYS:
+        fields[name] = section(name)
+    graph = Graph(deltas=header.get("deltas", 0), **fields)
+
+    try:
+        with open(journal_path(path), encoding="utf-8") as f:
+            for line in f:
+                delta = json.loads(line)
+                graph.apply_delta(delta["people"], delta["movies"],
+                                  delta["stars"])
+    except FileNotFoundError:
+        pass
+    return graph
+
+
+def apply_snapshot_delta(graph, path, delta_directory):
+    """
+    Applies the delta CSV files in delta_directory to graph, which was
+    loaded from the snapshot at path, and records them in its journal.
+    Returns the set of indices of movies that gained stars.
+    """
+    people, movies, stars = read_delta(delta_directory)
+    touched = graph.apply_delta(people, movies, stars)
+    delta = {"people": people, "movies": movies, "stars": stars}
+    with open(journal_path(path), "a", encoding="utf-8") as f:
+        f.write(json.dumps(delta) + "\n")
+    return touched
+
+
+def compact_snapshot(graph, path, directory):
+    """
+    Rewrites the snapshot at path with its journal merged in, and
+    removes the journal.
+    """
+    save_snapshot(graph, path, source_stats(directory))
+    _remove(journal_path(path))
+
+
+def write_sections(path, magic, header, sections):
+    """
+    Writes a file of named buffers behind magic and a JSON header.
+    sections is a list of (name, buffer) pairs, and header is a dict
+    of extra entries to store alongside the section layout.
+    """
+    layout = {}
+    position = 0
+    for name, buffer in sections:
+        view = memoryview(buffer)
+        layout[name] = [position, view.nbytes, view.format]
+        position += _padded(view.nbytes)
+
+    header = json.dumps(
+        dict(header, byteorder=sys.byteorder, sections=layout)
+    ).encode("utf-8")
+    start = _padded(len(magic) + 4 + len(header))
+
+    # Write beside the final path and rename, so readers never see half a file
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(magic)
+        f.write(struct.pack("<I", len(header)))
+        f.write(header)
+        f.write(bytes(start - f.tell()))
+        for name, buffer in sections:
+            view = memoryview(buffer).cast("B")
+            f.write(view)
+            f.write(bytes(_padded(view.nbytes) - view.nbytes))
+    os.replace(temporary, path)
+
+
+def read_header(path, magic=MAGIC):
+    """
+    Returns the parsed header of a file written by write_sections and
+    the offset at which its sections begin, or None if path does not
+    start with magic.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(magic)) != magic:
+            return None
+        (length,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(length))
+    return header, _padded(len(magic) + 4 + length)
+
+
+def map_sections(path, magic):
+    """
+    Memory-maps a file written by write_sections. Returns its header
+    and a function that returns the named section as a memoryview.
+    """
+    header, start = read_header(path, magic)
+    with open(path, "rb") as f:
+        # The map stays open for as long as any view refers to it
+        buffer = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def section(name):
+        offset, length, format = header["sections"][name]
+        view = buffer[start + offset:start + offset + length]
+        return view if format == "B" else view.cast(format)
+
+    return header, section
+
+
+def is_fresh(path, directory, magic=MAGIC):
+    """
+    Returns True if the file at path was built from the CSV files
+    currently in directory.
+    """
+    try:
+        header = read_header(path, magic)
+    except (OSError, ValueError, struct.error):
+        return False
+    if header is None:
+        return False
+    header, _ = header
+    return (header["byteorder"] == sys.byteorder
+            and header["sources"] == source_stats(directory))
+
+
+def load_cached_graph(directory):
+    """
+    Returns the Graph for directory, from its snapshot if that is up to
+    date, otherwise by parsing the CSV files and writing a new snapshot.
+    """
+    path = snapshot_path(directory)
+    if is_fresh(path, directory):
+        return load_snapshot(path)
+
+    sources = source_stats(directory)
+    graph = load_graph(directory)
+    try:
+        # A journal belongs to the snapshot it was written beside
+        _remove(journal_path(path))
+        save_snapshot(graph, path, sources)
+    except OSError:
+        # A read-only dataset can still be used, just without the cache
+        return graph
+    return load_snapshot(path)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _padded(length):
+    return -(-length // ALIGNMENT) * ALIGNMENT
@@ -0,0 +1,354 @@
+"""
+Benchmarks for the Tic-Tac-Toe AI.
+
+Usage: python benchmark.py minimax
+       python benchmark.py alphabeta [--repeat N]
+       python benchmark.py bitboard [--repeat N]
+       python benchmark.py mnk [--size M N K] [--budget SECONDS]
+       python benchmark.py book [--repeat N]
+       python benchmark.py mcts [--size M N K] [--budgets N ...] [--games N]
+                                [--opponent random|alphabeta] [--workers N]
+"""
+
+import argparse
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import bitboard
+import book
+import mcts
+import mnk
+import tictactoe as ttt
+
+
+def count_nodes():
+    """
+    Wraps tictactoe.result and GameState.play so that every position
+    they create is counted. Returns a dict whose "nodes" entry holds the
+    running count, and a function that restores the originals.
+    """
+    originals = [(ttt, "result", ttt.result),
+                 (ttt.GameState, "play", ttt.GameState.play)]
+    counter = {"nodes": 0}
+
+    def counted(function):
+        def wrapper(*args):
+            counter["nodes"] += 1
+            return function(*args)
+        return wrapper
+
+    def restore():
+        for owner, name, function in originals:
+            setattr(owner, name, function)
+
+    for owner, name, function in originals:
+        setattr(owner, name, counted(function))
+    return counter, restore
+
+
+def self_play(engine):
+    """
+    Plays engine against itself from the empty board. Returns the final
+    board and a list of (nodes, seconds) for each move.
+    """
+    board = ttt.initial_state()
+    moves = []
+    while not ttt.terminal(board):
+        counter, restore = count_nodes()
+        try:
+            start = time.perf_counter()
+            action = engine(board)
+            elapsed = time.perf_counter() - start
+        finally:
+            restore()
+        moves.append((counter["nodes"], elapsed))
+        board = ttt.result(board, action)
+    return board, moves
+
+
+def bench_minimax(args):
+    """
+    Compares exhaustive minimax with the transposition table, both with
+    an empty table and with one left over from an earlier game. The
+    opening book is set aside so that every move is searched.
+    """
+    saved, ttt.book = ttt.book, None
+    ttt.transpositions.clear()
+    try:
+        for name, engine in [
+            ("exhaustive", ttt.exhaustive_minimax),
+            ("table, cold", ttt.minimax),
+            ("table, warm", ttt.minimax)
+        ]:
+            board, moves = self_play(engine)
+            if ttt.winner(board) is not None:
+                raise Exception(f"{name} lost a game against itself")
+            nodes = sum(n for n, _ in moves)
+            seconds = sum(t for _, t in moves)
+            first_nodes, first_seconds = moves[0]
+            print(f"{name:>12}: game {nodes:>7} nodes {seconds:8.4f}s  "
+                  f"first move {first_nodes:>7} nodes {first_seconds:8.4f}s")
+    finally:
+        ttt.book = saved
+    print(f"{len(ttt.transpositions)} positions in the table")
+
+
+def bench_alphabeta(args):
+    """
+    Measures positions searched per second when choosing the first move
+    from the empty board, with and without alpha-beta pruning, and
+    checks that alpha-beta chooses a move of the same minimax value.
+    """
+    board = ttt.initial_state()
+    for name, engine, repeat in [
+        ("exhaustive", ttt.exhaustive_minimax, 1),
+        ("alpha-beta", ttt.alphabeta, args.repeat)
+    ]:
+        nodes = 0
+        seconds = 0.0
+        for _ in range(repeat):
+            counter, restore = count_nodes()
+            try:
+                start = time.perf_counter()
+                action = engine(board)
+                seconds += time.perf_counter() - start
+            finally:
+                restore()
+            nodes += counter["nodes"]
+        print(f"{name:>12}: {nodes // repeat:>7} positions "
+              f"{seconds / repeat:8.4f}s  "
+              f"{nodes / seconds:>9.0f} positions/s  move {action}")
+
+    ttt.transpositions.clear()
+    if ttt.value(ttt.result(board, action)) != ttt.value(board):
+        raise Exception("alpha-beta chose a move that is not optimal")
+
+    board, moves = self_play(ttt.alphabeta)
+    if ttt.winner(board) is not None:
+        raise Exception("alpha-beta lost a game against itself")
+    nodes = sum(n for n, _ in moves)
+    seconds = sum(t for _, t in moves)
+    print(f"{'game':>12}: {nodes:>7} positions {seconds:8.4f}s")
+
+
+def bench_bitboard(args):
+    """
+    Compares list boards with bitboards, first on the single operations
+    a search makes at every node, then on an exhaustive search from the
+    empty board.
+    """
+    board = ttt.result(ttt.initial_state(), (1, 1))
+    bits = bitboard.from_board(board)
+    for name, list_call, bit_call in [
+        ("player", lambda: ttt.player(board), lambda: bitboard.player(bits)),
+        ("actions", lambda: ttt.actions(board),
+         lambda: bitboard.actions(bits)),
+        ("result", lambda: ttt.result(board, (0, 0)),
+         lambda: bitboard.result(bits, 0)),
+        ("winner", lambda: ttt.winner(board), lambda: bitboard.winner(bits)),
+        ("terminal", lambda: ttt.terminal(board),
+         lambda: bitboard.terminal(bits)),
+    ]:
+        times = []
+        for call in (list_call, bit_call):
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                call()
+            times.append((time.perf_counter() - start) / args.repeat * 1e9)
+        print(f"{name:>12}: list {times[0]:7.0f}ns  bitboard {times[1]:7.0f}ns"
+              f"  {times[0] / times[1]:5.1f}x")
+
+    start = time.perf_counter()
+    list_value = ttt.utility(ttt.result(
+        ttt.initial_state(), ttt.exhaustive_minimax(ttt.initial_state())
+    ))
+    list_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    bit_value = bitboard.exhaustive_value(bitboard.initial_state())
+    bit_seconds = time.perf_counter() - start
+    print(f"{'exhaustive':>12}: list {list_seconds:7.3f}s  "
+          f"bitboard {bit_seconds:7.3f}s  {list_seconds / bit_seconds:5.1f}x")
+    if list_value != bit_value:
+        raise Exception("bitboard search disagrees with list search")
+
+
+def bench_mnk(args):
+    """
+    Plays the m,n,k engine against itself under a per-move time budget,
+    reporting the depth reached and time taken for every move.
+    """
+    m, n, k = args.size
+    game = mnk.Game(m, n, k)
+    board = game.initial_state()
+    latencies = []
+    while not game.terminal(board):
+        turn = game.player(board)
+        action = game.best_move(board, args.budget)
+        stats = game.stats
+        latencies.append(stats["seconds"])
+        print(f"{turn} {str(action):>8}: depth {stats['depth']:>2} "
+              f"{stats['nodes']:>8} nodes {stats['seconds']:7.3f}s  "
+              f"{stats['nodes'] / stats['seconds']:>7.0f} nodes/s")
+        board = game.result(board, action)
+
+    for row in board:
+        print("".join(cell or "." for cell in row))
+    won = game.winner(board)
+    print(f"{'tie' if won is None else won + ' wins'} after {len(latencies)} "
+          f"moves, longest move {max(latencies):.3f}s "
+          f"against a budget of {args.budget}s")
+
+
+def bench_book(args):
+    """
+    Times building the opening book, and minimax on the empty board with
+    the book against a search with a cold transposition table.
+    """
+    start = time.perf_counter()
+    table = book.build_book()
+    print(f"{'build':>12}: {time.perf_counter() - start:8.4f}s  "
+          f"{len(book.BOOK_MAGIC) + len(table)} bytes")
+
+    board = ttt.initial_state()
+    saved, ttt.book = ttt.book, bytes(table)
+    try:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            ttt.minimax(board)
+        lookup = (time.perf_counter() - start) / args.repeat
+
+        ttt.book = None
+        ttt.transpositions.clear()
+        start = time.perf_counter()
+        ttt.minimax(board)
+        search = time.perf_counter() - start
+    finally:
+        ttt.book = saved
+    print(f"{'book':>12}: {lookup * 1e6:10.2f}us per move")
+    print(f"{'search':>12}: {search * 1e6:10.2f}us for the first move")
+
+
+def play_game(game, players):
+    """
+    Plays a game between players, a dict mapping X and O to functions
+    from a board to an action. Returns the winner, or None for a tie.
+    """
+    board = game.initial_state()
+    while not game.terminal(board):
+        board = game.result(board, players[game.player(board)](board))
+    return game.winner(board)
+
+
+def bench_mcts(args):
+    """
+    Measures MCTS rollouts per second in one process and across a pool,
+    then plays MCTS with each rollout budget against an opponent, taking
+    each side in turn.
+    """
+    m, n, k = args.size
+    game = mnk.Game(m, n, k)
+    board = game.initial_state()
+    rollouts = max(args.budgets)
+
+    start = time.perf_counter()
+    mcts.best_move(game, board, rollouts, seed=0)
+    rate = rollouts / (time.perf_counter() - start)
+    print(f"{'1 process':>12}: {rate:9.0f} rollouts/s")
+
+    with ProcessPoolExecutor(args.workers) as executor:
+        # Start the workers before timing them
+        mcts.best_move(game, board, args.workers, executor, args.workers)
+        start = time.perf_counter()
+        mcts.best_move(game, board, rollouts, executor, args.workers, seed=0)
+        rate = rollouts / (time.perf_counter() - start)
+    print(f"{f'{args.workers} processes':>12}: {rate:9.0f} rollouts/s  "
+          f"{rate / args.workers:9.0f} per core")
+
+    rng = random.Random(0)
+    if args.opponent == "random":
+        def opponent(board):
+            return rng.choice(sorted(game.actions(board)))
+    else:
+        def opponent(board):
+            return game.best_move(board, args.budget)
+
+    for budget in args.budgets:
+        def engine(board):
+            return mcts.best_move(game, board, budget,
+                                  seed=rng.randrange(2 ** 32))
+
+        results = {"win": 0, "tie": 0, "loss": 0}
+        for i in range(args.games):
+            side = ttt.X if i % 2 == 0 else ttt.O
+            other = ttt.O if side == ttt.X else ttt.X
+            won = play_game(game, {side: engine, other: opponent})
+            results["tie" if won is None else
+                    "win" if won == side else "loss"] += 1
+        print(f"{budget:>8} rollouts: {results['win']:>4} won "
+              f"{results['tie']:>4} tied {results['loss']:>4} lost "
+              f"against {args.opponent}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    minimax = commands.add_parser("minimax", help="compare minimax solvers")
+    minimax.set_defaults(run=bench_minimax)
+
+    alphabeta = commands.add_parser(
+        "alphabeta", help="positions per second with alpha-beta pruning"
+    )
+    alphabeta.add_argument("--repeat", type=int, default=20,
+                           help="searches from the empty board to time")
+    alphabeta.set_defaults(run=bench_alphabeta)
+
+    bits = commands.add_parser(
+        "bitboard", help="compare list boards with bitboards"
+    )
+    bits.add_argument("--repeat", type=int, default=100000,
+                      help="calls to time for each operation")
+    bits.set_defaults(run=bench_bitboard)
+
+    game = commands.add_parser(
+        "mnk", help="self-play of the m,n,k engine under a time budget"
+    )
+    game.add_argument("--size", metavar=("M", "N", "K"), type=int, nargs=3,
+                      default=[7, 7, 5], help="rows, columns and k in a row")
+    game.add_argument("--budget", type=float, default=1.0,
+                      help="seconds per move")
+    game.set_defaults(run=bench_mnk)
+
+    lookup = commands.add_parser(
+        "book", help="compare the opening book with search"
+    )
+    lookup.add_argument("--repeat", type=int, default=10000,
+                        help="lookups to time")
+    lookup.set_defaults(run=bench_book)
+
+    tree = commands.add_parser(
+        "mcts", help="Monte Carlo Tree Search speed and strength"
+    )
+    tree.add_argument("--size", metavar=("M", "N", "K"), type=int, nargs=3,
+                      default=[3, 3, 3], help="rows, columns and k in a row")
+    tree.add_argument("--budgets", metavar="N", type=int, nargs="+",
+                      default=[10, 100, 1000], help="rollouts per move")
+    tree.add_argument("--games", type=int, default=20,
+                      help="games per budget")
+    tree.add_argument("--opponent", choices=["random", "alphabeta"],
+                      default="random")
+    tree.add_argument("--budget", type=float, default=0.1,
+                      help="seconds per move for the alphabeta opponent")
+    tree.add_argument("--workers", type=int, default=4,
+                      help="processes to grow trees in")
+    tree.set_defaults(run=bench_mcts)
+
+    args = parser.parse_args()
+    if args.command == "mcts" and min(args.budgets) < 1:
+        tree.error("--budgets must each be at least 1")
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Bitboard Tic Tac Toe
+
+A board is a pair (x, o) of 9-bit integers, one per player, where bit
+3 * i + j is set if that player has moved at row i, column j. Boards are
+immutable and hashable, so making a move allocates one small tuple rather
+than copying nine cells, and every question about a board is answered
+with a few bit operations.
+
+from_board and to_board convert to and from the list boards used by
+tictactoe.py and runner.py, and best_action answers for a list board.
+"""
+
+from tictactoe import EMPTY, O, X
+
+FULL = 0b111_111_111
+
+# Rows, columns and diagonals, each as the mask of its three cells
+WIN_MASKS = (
+    0b000_000_111, 0b000_111_000, 0b111_000_000,
+    0b001_001_001, 0b010_010_010, 0b100_100_100,
+    0b100_010_001, 0b001_010_100,
+)
+
+# Every 9-bit pattern that contains a line, so winner is one lookup
+WINNING = [any(p & mask == mask for mask in WIN_MASKS)
+           for p in range(FULL + 1)]
+
+# Cells to try first, center then corners then edges
+ORDER = (4, 0, 2, 6, 8, 1, 3, 5, 7)
+
+# Minimax value of every bitboard solved so far
+values = {}
+
+
+def initial_state():
+    return (0, 0)
+
+
+def player(board):
+    """
+    Returns player who has the next turn on a board, or None if it is full.
+    """
+    x, o = board
+    if x | o == FULL:
+        return None
+    return X if x.bit_count() == o.bit_count() else O
+
+
+def actions(board):
+    """
+    Returns the empty cells of the board, as cell numbers 0-8.
+    """
+    x, o = board
+    free = FULL & ~(x | o)
+    return [cell for cell in ORDER if free >> cell & 1]
+
+
+def result(board, cell):
+    """
+    Returns the board that results from the next player moving at cell.
+    """
+    x, o = board
+    bit = 1 << cell
+    if (x | o) & bit:
+        raise Exception("Invalid action")
+    if x.bit_count() == o.bit_count():
+        return (x | bit, o)
+    return (x, o | bit)
+
+
+def winner(board):
+    """
+    Returns the winner of the game, if there is one.
+    """
+    x, o = board
+    if WINNING[x]:
+        return X
+    if WINNING[o]:
+        return O
+    return None
+
+
+def terminal(board):
+    """
+    Returns True if game is over, False otherwise.
+    """
+    x, o = board
+    return x | o == FULL or WINNING[x] or WINNING[o]
+
+
+def utility(board):
+    """
+    Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+    """
+    x, o = board
+    if WINNING[x]:
+        return 1
+    if WINNING[o]:
+        return -1
+    return 0
+
+
+def value(board):
+    """
+    Returns the minimax value of the board, remembering every board solved.
+    """
+    known = values.get(board)
+    if known is not None:
+        return known
+
+    if terminal(board):
+        v = utility(board)
+    else:
+        children = [value(result(board, cell)) for cell in actions(board)]
+        v = max(children) if player(board) == X else min(children)
+    values[board] = v
+    return v
+
+
+def exhaustive_value(board):
+    """
+    Returns the minimax value of the board, searching every line of play.
+    """
+    x, o = board
+    if WINNING[x]:
+        return 1
+    if WINNING[o]:
+        return -1
+    free = FULL & ~(x | o)
+    if not free:
+        return 0
+
+    if x.bit_count() == o.bit_count():
+        return max(exhaustive_value((x | 1 << cell, o))
+                   for cell in ORDER if free >> cell & 1)
+    return min(exhaustive_value((x, o | 1 << cell))
+               for cell in ORDER if free >> cell & 1)
+
+
+def minimax(board):
+    """
+    Returns the optimal cell for the current player on the board.
+    """
+    if terminal(board):
+        return None
+    best = max if player(board) == X else min
+    return best(actions(board), key=lambda cell: value(result(board, cell)))
+
+
+def from_board(board):
+    """
+    Returns the bitboard for a list board from tictactoe.py.
+    """
+    x = o = 0
+    for i, row in enumerate(board):
+        for j, cell in enumerate(row):
+            if cell == X:
+                x |= 1 << (3 * i + j)
+            elif cell == O:
+                o |= 1 << (3 * i + j)
+    return (x, o)
+
+
+def to_board(board):
+    """
+    Returns the list board for a bitboard.
+    """
+    x, o = board
+    cells = [X if x >> cell & 1 else O if o >> cell & 1 else EMPTY
+             for cell in range(9)]
+    return [cells[0:3], cells[3:6], cells[6:9]]
+
+
+def to_action(cell):
+    return divmod(cell, 3)
+
+
+def from_action(action):
+    i, j = action
+    return 3 * i + j
+
+
+def best_action(board):
+    """
+    Returns the optimal (i, j) action on a list board, like
+    tictactoe.minimax.
+    """
+    cell = minimax(from_board(board))
+    return None if cell is None else to_action(cell)
@@ -0,0 +1,95 @@
+"""
+Builds the Tic Tac Toe opening book: the optimal move and minimax value
+of every position that can arise in play, found by retrograde analysis.
+
+Every reachable position is generated and grouped by the number of
+pieces on the board. The groups are then solved from the full board
+back to the empty one, so the value of every position that a move can
+lead to is already known when a position is solved, and no position is
+searched twice.
+
+The book is written next to tictactoe.py, which reads it on import.
+
+Usage: python book.py [--output PATH]
+"""
+
+import argparse
+import os
+
+import bitboard
+from tictactoe import BOOK_MAGIC, BOOK_PATH, NO_MOVE, UNREACHABLE, X
+
+POWERS = [3 ** cell for cell in range(9)]
+
+
+def bitboard_index(board):
+    """
+    Returns tictactoe.board_index of the list board for a bitboard.
+    """
+    x, o = board
+    return sum(POWERS[cell] * ((x >> cell & 1) + 2 * (o >> cell & 1))
+               for cell in range(9))
+
+
+def reachable_positions():
+    """
+    Returns a list whose entry at i is the set of bitboards reachable
+    from the empty board with i pieces on them.
+    """
+    layers = [{bitboard.initial_state()}]
+    for _ in range(9):
+        layer = set()
+        for board in layers[-1]:
+            if not bitboard.terminal(board):
+                for cell in bitboard.actions(board):
+                    layer.add(bitboard.result(board, cell))
+        layers.append(layer)
+    return layers
+
+
+def build_book():
+    """
+    Returns the book table, one byte per board_index.
+    """
+    table = bytearray([UNREACHABLE]) * 3 ** 9
+    values = {}
+    for layer in reversed(reachable_positions()):
+        for board in layer:
+            if bitboard.terminal(board):
+                move, v = NO_MOVE, bitboard.utility(board)
+            else:
+                # Every move leads into the layer solved just before
+                best = max if bitboard.player(board) == X else min
+                move = best(
+                    bitboard.actions(board),
+                    key=lambda cell: values[bitboard.result(board, cell)]
+                )
+                v = values[bitboard.result(board, move)]
+            values[board] = v
+            table[bitboard_index(board)] = move | (v + 1) << 4
+    return table
+
+
+def save_book(table, path=BOOK_PATH):
+    # Write beside the final path and rename, so readers never see half a file
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(BOOK_MAGIC)
+        f.write(table)
+    os.replace(temporary, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--output", default=BOOK_PATH,
+                        help="where to write the book")
+    args = parser.parse_args()
+
+    table = build_book()
+    save_book(table, args.output)
+    positions = sum(entry != UNREACHABLE for entry in table)
+    print(f"Wrote {positions} positions to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
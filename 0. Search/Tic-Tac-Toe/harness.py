@@ -0,0 +1,259 @@
+"""
+Headless harness for comparing Tic Tac Toe engines.
+
+play has every pair of the named engines play each other, taking each
+side in turn, and evaluate has each engine choose a move in every
+position of a file. Both report, for each engine, the positions it
+searched, its moves per second and percentiles of the time it took per
+move. evaluate also counts the moves that were not optimal.
+
+A position file holds one board per line as 9 characters in reading
+order, X, O or . for an empty cell, such as "X...O...." Blank lines and
+lines starting with # are skipped. positions writes every position that
+can arise in play and is not over.
+
+Usage: python harness.py play ENGINE ENGINE ... [--games N] [OPTIONS]
+       python harness.py evaluate FILE ENGINE ... [OPTIONS]
+       python harness.py positions FILE
+
+Options: --seed N, --budget SECONDS, --rollouts N
+
+Engines: book, table, alphabeta, exhaustive, bitboard, mnk, mcts, random
+"""
+
+import argparse
+import random
+import time
+
+import bitboard
+import mcts
+import mnk
+import tictactoe as ttt
+from benchmark import count_nodes
+
+PERCENTILES = [50, 90, 99]
+
+
+class Engine():
+    """
+    A move function together with the moves, nodes and latencies it has
+    been measured over.
+    """
+
+    def __init__(self, name, choose):
+        self.name = name
+        # Returns (action, nodes) for a board
+        self.choose = choose
+        self.latencies = []
+        self.nodes = 0
+        self.mistakes = 0
+
+    def move(self, board):
+        counter, restore = count_nodes()
+        try:
+            start = time.perf_counter()
+            action, nodes = self.choose(board)
+            elapsed = time.perf_counter() - start
+        finally:
+            restore()
+        self.latencies.append(elapsed)
+        self.nodes += counter["nodes"] if nodes is None else nodes
+        return action
+
+    def report(self):
+        moves = len(self.latencies)
+        if moves == 0:
+            return f"{self.name:>10}: no moves"
+        seconds = sum(self.latencies)
+        ranked = sorted(self.latencies)
+        line = (f"{self.name:>10}: {moves:>7} moves {self.nodes:>10} nodes "
+                f"{moves / seconds if seconds else 0:>9.0f} moves/s")
+        for p in PERCENTILES:
+            latency = ranked[min(moves - 1, p * moves // 100)]
+            line += f"  p{p} {latency * 1000:7.3f}ms"
+        return line + f"  max {ranked[-1] * 1000:7.3f}ms"
+
+
+def make_engines(names, args):
+    """
+    Returns an Engine for each name. Engines count their nodes through
+    count_nodes unless they report their own.
+    """
+    game = mnk.Game()
+    rng = random.Random(args.seed)
+
+    def book(board):
+        return ttt.minimax(board), None
+
+    def table(board):
+        # Search as if there were no opening book
+        saved, ttt.book = ttt.book, None
+        try:
+            return ttt.minimax(board), None
+        finally:
+            ttt.book = saved
+
+    def alphabeta(board):
+        return ttt.alphabeta(board), None
+
+    def exhaustive(board):
+        return ttt.exhaustive_minimax(board), None
+
+    def bits(board):
+        # Counts the positions newly solved
+        solved = len(bitboard.values)
+        action = bitboard.best_action(board)
+        return action, len(bitboard.values) - solved
+
+    def iterative(board):
+        action = game.best_move(board, args.budget)
+        return action, game.stats["nodes"]
+
+    def tree(board):
+        action = mcts.best_move(game, board, args.rollouts,
+                                seed=rng.randrange(2 ** 32))
+        return action, args.rollouts
+
+    def uniform(board):
+        return rng.choice(sorted(ttt.actions(board))), 0
+
+    choosers = {
+        "book": book, "table": table, "alphabeta": alphabeta,
+        "exhaustive": exhaustive, "bitboard": bits, "mnk": iterative,
+        "mcts": tree, "random": uniform
+    }
+    return [Engine(name, choosers[name]) for name in names]
+
+
+def play_game(x, o):
+    """
+    Plays engine x against engine o. Returns the winner, or None for a tie.
+    """
+    board = ttt.initial_state()
+    while not ttt.terminal(board):
+        engine = x if ttt.player(board) == ttt.X else o
+        board = ttt.result(board, engine.move(board))
+    return ttt.winner(board)
+
+
+def play(args):
+    engines = make_engines(args.engines, args)
+    for i, first in enumerate(engines):
+        for second in engines[i + 1:]:
+            results = {first.name: 0, second.name: 0, None: 0}
+            for game in range(args.games):
+                x, o = (first, second) if game % 2 == 0 else (second, first)
+                won = play_game(x, o)
+                results[None if won is None else
+                        x.name if won == ttt.X else o.name] += 1
+            print(f"{first.name} against {second.name}: "
+                  f"{results[first.name]} won, {results[None]} tied, "
+                  f"{results[second.name]} lost")
+    for engine in engines:
+        print(engine.report())
+
+
+def read_positions(path):
+    """
+    Returns the boards in a position file.
+    """
+    cells = {"X": ttt.X, "O": ttt.O, ".": ttt.EMPTY}
+    boards = []
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if len(line) != 9 or any(c not in cells for c in line):
+                raise ValueError(f"{path}:{number}: not a board: {line!r}")
+            boards.append([[cells[c] for c in line[i:i + 3]]
+                           for i in range(0, 9, 3)])
+    return boards
+
+
+def evaluate(args):
+    boards = [board for board in read_positions(args.file)
+              if not ttt.terminal(board)]
+    optimal = [bitboard.value(bitboard.from_board(board)) for board in boards]
+    engines = make_engines(args.engines, args)
+    for engine in engines:
+        # Every engine starts without positions solved by the last one
+        ttt.transpositions.clear()
+        bitboard.values.clear()
+        chosen = [engine.move(board) for board in boards]
+        for board, action, v in zip(boards, chosen, optimal):
+            result = bitboard.from_board(ttt.result(board, action))
+            if bitboard.value(result) != v:
+                engine.mistakes += 1
+    print(f"{len(boards)} positions")
+    for engine in engines:
+        print(f"{engine.report()}  {engine.mistakes} not optimal")
+
+
+def positions(args):
+    boards = {}
+    layer = [bitboard.initial_state()]
+    while layer:
+        next_layer = []
+        for board in layer:
+            if board not in boards and not bitboard.terminal(board):
+                boards[board] = None
+                next_layer.extend(bitboard.result(board, cell)
+                                  for cell in bitboard.actions(board))
+        layer = next_layer
+    symbols = {ttt.X: "X", ttt.O: "O", ttt.EMPTY: "."}
+    with open(args.file, "w") as f:
+        for board in boards:
+            f.write("".join(symbols[cell]
+                            for row in bitboard.to_board(board)
+                            for cell in row) + "\n")
+    print(f"Wrote {len(boards)} positions to {args.file}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+
+    # Options of the engines, shared by every command that runs them
+    options = argparse.ArgumentParser(add_help=False)
+    options.add_argument("--seed", type=int, default=0,
+                         help="seed for the random and mcts engines")
+    options.add_argument("--budget", type=float, default=0.1,
+                         help="seconds per move for the mnk engine")
+    options.add_argument("--rollouts", type=int, default=1000,
+                         help="rollouts per move for the mcts engine")
+
+    commands = parser.add_subparsers(dest="command", required=True)
+    engine_names = ["book", "table", "alphabeta", "exhaustive", "bitboard",
+                    "mnk", "mcts", "random"]
+
+    games = commands.add_parser("play", parents=[options],
+                                help="play engines against each other")
+    games.add_argument("engines", nargs="+", choices=engine_names,
+                       metavar="ENGINE")
+    games.add_argument("--games", type=int, default=100,
+                       help="games for each pair of engines")
+    games.set_defaults(run=play)
+
+    batch = commands.add_parser("evaluate", parents=[options],
+                                help="choose a move in every position")
+    batch.add_argument("file")
+    batch.add_argument("engines", nargs="+", choices=engine_names,
+                       metavar="ENGINE")
+    batch.set_defaults(run=evaluate)
+
+    listing = commands.add_parser("positions",
+                                  help="write every position to a file")
+    listing.add_argument("file")
+    listing.set_defaults(run=positions)
+
+    args = parser.parse_args()
+    if args.command == "play" and len(args.engines) < 2:
+        games.error("play needs at least two engines")
+    if args.command != "positions" and args.rollouts < 1:
+        command = games if args.command == "play" else batch
+        command.error("--rollouts must be at least 1")
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Monte Carlo Tree Search player for m,n,k-games, for boards too large for
+minimax to finish.
+
+Each iteration walks down the tree choosing the child with the best UCT
+score, adds one new child, plays random moves from it to the end of the
+game, and credits the result to every node on the way back up. The move
+visited most at the root is played.
+
+Positions are held as a pair of integers with one bit per cell for each
+player, so a random playout only sets bits and tests the masks of the
+lines through each cell played. Several independent trees can be grown
+in a process pool, and their root statistics are added together.
+"""
+
+import math
+import os
+import random
+
+from tictactoe import O, X
+
+# Weight of exploration against the win rate in the UCT score
+EXPLORATION = math.sqrt(2)
+
+
+class Node():
+    __slots__ = ("move", "parent", "player", "children", "untried",
+                 "visits", "wins", "terminal", "winner")
+
+    def __init__(self, move, parent, player, untried):
+        self.move = move
+        self.parent = parent
+        # The player who made move, and whose wins are counted here
+        self.player = player
+        self.children = []
+        self.untried = untried
+        self.visits = 0
+        self.wins = 0.0
+        self.terminal = False
+        self.winner = None
+
+    def uct(self, log_visits):
+        return (self.wins / self.visits
+                + EXPLORATION * math.sqrt(log_visits / self.visits))
+
+
+class Tree():
+
+    def __init__(self, game, board, seed=None):
+        self.size = game.m * game.n
+        self.random = random.Random(seed)
+
+        # Masks of the lines through each cell
+        self.cell_masks = [
+            [sum(1 << c for c in game.lines[line])
+             for line in game.cell_lines[cell]]
+            for cell in range(self.size)
+        ]
+
+        cells = [cell for row in board for cell in row]
+        self.x = sum(1 << c for c, cell in enumerate(cells) if cell == X)
+        self.o = sum(1 << c for c, cell in enumerate(cells) if cell == O)
+        self.turn = X if cells.count(X) == cells.count(O) else O
+        self.root = Node(None, None, O if self.turn == X else X,
+                         self.shuffled(self.x | self.o))
+
+    def shuffled(self, taken):
+        """
+        Returns the cells not in taken, in random order.
+        """
+        cells = [c for c in range(self.size) if not taken >> c & 1]
+        self.random.shuffle(cells)
+        return cells
+
+    def wins(self, pieces, cell):
+        """
+        Returns True if pieces holds a complete line through cell.
+        """
+        for mask in self.cell_masks[cell]:
+            if pieces & mask == mask:
+                return True
+        return False
+
+    def iterate(self):
+        """
+        Runs one round of selection, expansion, playout and update.
+        """
+        node = self.root
+        x, o, turn = self.x, self.o, self.turn
+
+        # Select
+        while not node.untried and node.children:
+            log_visits = math.log(node.visits)
+            node = max(node.children, key=lambda c: c.uct(log_visits))
+            if turn == X:
+                x |= 1 << node.move
+                turn = O
+            else:
+                o |= 1 << node.move
+                turn = X
+
+        # Expand
+        if node.untried:
+            cell = node.untried.pop()
+            if turn == X:
+                x |= 1 << cell
+                won = self.wins(x, cell)
+            else:
+                o |= 1 << cell
+                won = self.wins(o, cell)
+            child = Node(cell, node, turn, [])
+            if won:
+                child.terminal = True
+                child.winner = turn
+            elif x | o == (1 << self.size) - 1:
+                child.terminal = True
+            else:
+                child.untried = self.shuffled(x | o)
+            node.children.append(child)
+            node = child
+            turn = O if turn == X else X
+
+        # Play out
+        if node.terminal:
+            winner = node.winner
+        else:
+            winner = self.playout(x, o, turn)
+
+        # Update
+        while node is not None:
+            node.visits += 1
+            if winner is None:
+                node.wins += 0.5
+            elif winner == node.player:
+                node.wins += 1
+            node = node.parent
+
+    def playout(self, x, o, turn):
+        """
+        Plays random moves to the end of the game. Returns the winner, or
+        None for a tie.
+        """
+        for cell in self.shuffled(x | o):
+            if turn == X:
+                x |= 1 << cell
+                if self.wins(x, cell):
+                    return X
+                turn = O
+            else:
+                o |= 1 << cell
+                if self.wins(o, cell):
+                    return O
+                turn = X
+        return None
+
+    def root_stats(self):
+        """
+        Returns {cell: (visits, wins)} for every move tried at the root.
+        """
+        return {child.move: (child.visits, child.wins)
+                for child in self.root.children}
+
+
+def search(game, board, rollouts, seed=None):
+    """
+    Grows one tree for rollouts iterations. Returns its root statistics.
+    """
+    tree = Tree(game, board, seed)
+    if tree.root.untried:
+        for _ in range(rollouts):
+            tree.iterate()
+    return tree.root_stats()
+
+
+def merge(results):
+    """
+    Adds together the root statistics of several trees.
+    """
+    merged = {}
+    for stats in results:
+        for cell, (visits, wins) in stats.items():
+            total_visits, total_wins = merged.get(cell, (0, 0.0))
+            merged[cell] = (total_visits + visits, total_wins + wins)
+    return merged
+
+
+def best_move(game, board, rollouts=10000, executor=None, trees=None,
+              seed=None):
+    """
+    Returns the action (i, j) visited most across trees trees grown in
+    executor, a process pool, sharing rollouts iterations between them.
+    Grows one tree in this process if there is no executor.
+    """
+    if rollouts < 1:
+        raise ValueError("MCTS needs at least one rollout")
+    if game.terminal(board):
+        return None
+
+    seeds = random.Random(seed)
+    if executor is None:
+        stats = search(game, board, rollouts, seeds.randrange(2 ** 32))
+    else:
+        trees = trees or os.cpu_count()
+        shares = [rollouts // trees + (i < rollouts % trees)
+                  for i in range(trees)]
+        stats = merge(executor.map(
+            search, [game] * trees, [board] * trees, shares,
+            [seeds.randrange(2 ** 32) for _ in range(trees)]
+        ))
+    cell = max(stats, key=lambda cell: stats[cell][0])
+    return divmod(cell, game.n)
@@ -0,0 +1,302 @@
+"""
+m,n,k-games: Tic Tac Toe on a board of m rows and n columns, won by the
+first player to get k in a row.
+
+Boards are lists of rows like those of tictactoe.py, so Game(3, 3, 3)
+plays ordinary Tic Tac Toe. Larger boards are far too big to search to
+the end, so best_move runs a depth-limited alpha-beta search, one ply
+deeper each time, until its time budget runs out, and returns the move
+chosen by the deepest search that finished. Positions where the depth
+runs out are scored by how many pieces each player has in lines they
+could still complete, and as won by the player to move if they have a
+line one piece short of complete.
+"""
+
+import time
+
+from tictactoe import EMPTY, O, X
+
+DIRECTIONS = [(0, 1), (1, 0), (1, 1), (1, -1)]
+
+# Nodes searched between looks at the clock
+CHECK_INTERVAL = 256
+
+
+class Timeout(Exception):
+    pass
+
+
+class Game():
+
+    def __init__(self, m=3, n=3, k=3):
+        if m < 1 or n < 1 or not 1 <= k <= max(m, n):
+            raise ValueError(f"no {k} in a row on a {m}x{n} board")
+        self.m = m
+        self.n = n
+        self.k = k
+
+        # Every run of k cells in a straight line, numbering cells
+        # i * n + j, and the runs through each cell
+        self.lines = []
+        for i in range(m):
+            for j in range(n):
+                for di, dj in DIRECTIONS:
+                    if (0 <= i + di * (k - 1) < m
+                            and 0 <= j + dj * (k - 1) < n):
+                        self.lines.append(tuple(
+                            (i + di * s) * n + j + dj * s for s in range(k)
+                        ))
+        self.cell_lines = [[] for _ in range(m * n)]
+        for line, cells in enumerate(self.lines):
+            for cell in cells:
+                self.cell_lines[cell].append(line)
+
+        # Cells nearest the center are tried first
+        self.order = sorted(
+            range(m * n),
+            key=lambda cell: (abs(cell // n - (m - 1) / 2)
+                              + abs(cell % n - (n - 1) / 2))
+        )
+
+        # Score of a line holding c pieces of one player and none of the
+        # other, and a win, which outweighs every line on the board at once
+        self.weights = [0] + [10 ** c for c in range(k - 1)] + [0]
+        self.win = len(self.lines) * 10 ** k
+
+        # Details of the last call to best_move
+        self.stats = {}
+
+    def initial_state(self):
+        return [[EMPTY] * self.n for _ in range(self.m)]
+
+    def player(self, board):
+        """
+        Returns player who has the next turn on a board, or None if it
+        is full.
+        """
+        count_x = sum(row.count(X) for row in board)
+        count_o = sum(row.count(O) for row in board)
+        if count_x + count_o == self.m * self.n:
+            return None
+        return X if count_x == count_o else O
+
+    def actions(self, board):
+        """
+        Returns set of all possible actions (i, j) available on the board.
+        """
+        return {(i, j)
+                for i in range(self.m) for j in range(self.n)
+                if board[i][j] == EMPTY}
+
+    def result(self, board, action):
+        """
+        Returns the board that results from making move (i, j) on the board.
+        """
+        i, j = action
+        if board[i][j] != EMPTY:
+            raise Exception("Invalid action")
+        new_board = [row[:] for row in board]
+        new_board[i][j] = self.player(board)
+        return new_board
+
+    def winner(self, board):
+        """
+        Returns the winner of the game, if there is one.
+        """
+        cells = [cell for row in board for cell in row]
+        for line in self.lines:
+            first = cells[line[0]]
+            if first != EMPTY and all(cells[c] == first for c in line):
+                return first
+        return None
+
+    def terminal(self, board):
+        """
+        Returns True if game is over, False otherwise.
+        """
+        return self.winner(board) is not None or self.player(board) is None
+
+    def utility(self, board):
+        """
+        Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+        """
+        won = self.winner(board)
+        return 1 if won == X else -1 if won == O else 0
+
+    def best_move(self, board, budget=1.0, max_depth=None):
+        """
+        Returns the best action (i, j) for the current player that can be
+        found within budget seconds, searching at most max_depth plies.
+        """
+        start = time.perf_counter()
+        deadline = start + budget
+        if self.terminal(board):
+            return None
+
+        turn = self.player(board)
+        empty = sum(row.count(EMPTY) for row in board)
+        if max_depth is None or max_depth > empty:
+            max_depth = empty
+
+        moves = Search(self, board, deadline).candidates()
+        best = moves[0]
+        self.stats = {"depth": 0, "nodes": 0, "value": None}
+        for depth in range(1, max_depth + 1):
+            # A search cut off by the clock leaves its board half played,
+            # so each depth starts from a fresh copy
+            search = Search(self, board, deadline)
+            try:
+                value, best = search.root(turn, depth, moves)
+            except Timeout:
+                self.stats["nodes"] += search.nodes
+                break
+            self.stats["depth"] = depth
+            self.stats["nodes"] += search.nodes
+            self.stats["value"] = value
+
+            # Search the best move first at the next depth
+            moves.remove(best)
+            moves.insert(0, best)
+
+            # Stop once the outcome is certain
+            if abs(value) > self.win - self.m * self.n:
+                break
+        self.stats["seconds"] = time.perf_counter() - start
+        return divmod(best, self.n)
+
+
+class Search():
+    """
+    A board being searched, stored as a flat list of cells along with the
+    number of pieces each player has in every line, so that moves can be
+    made and taken back, and wins and scores found, by looking only at the
+    lines through the cell played.
+    """
+
+    def __init__(self, game, board, deadline):
+        self.game = game
+        self.deadline = deadline
+        self.nodes = 0
+        self.cells = [cell for row in board for cell in row]
+        self.moves = 0
+        self.counts = {X: [0] * len(game.lines), O: [0] * len(game.lines)}
+        self.score = 0
+        # Lines each player could complete with one more move, which is
+        # every line while they are all empty if k is 1
+        empty = len(game.lines) if game.k == 1 else 0
+        self.threats = {X: empty, O: empty}
+        for cell, turn in enumerate(self.cells):
+            if turn != EMPTY:
+                self.cells[cell] = EMPTY
+                self.play(cell, turn)
+
+    def remove_line(self, line):
+        """
+        Takes the line out of the score and threat counts before it changes.
+        """
+        x = self.counts[X][line]
+        o = self.counts[O][line]
+        if o == 0:
+            self.score -= self.game.weights[x]
+        elif x == 0:
+            self.score += self.game.weights[o]
+        # Checked apart from the score, since an empty line is a threat
+        # to both players when k is 1
+        if o == 0 and x == self.game.k - 1:
+            self.threats[X] -= 1
+        if x == 0 and o == self.game.k - 1:
+            self.threats[O] -= 1
+
+    def add_line(self, line):
+        x = self.counts[X][line]
+        o = self.counts[O][line]
+        if o == 0:
+            self.score += self.game.weights[x]
+        elif x == 0:
+            self.score -= self.game.weights[o]
+        if o == 0 and x == self.game.k - 1:
+            self.threats[X] += 1
+        if x == 0 and o == self.game.k - 1:
+            self.threats[O] += 1
+
+    def play(self, cell, turn):
+        """
+        Moves turn at cell. Returns True if the move wins.
+        """
+        counts = self.counts[turn]
+        won = False
+        for line in self.game.cell_lines[cell]:
+            self.remove_line(line)
+            counts[line] += 1
+            if counts[line] == self.game.k:
+                won = True
+            self.add_line(line)
+        self.cells[cell] = turn
+        self.moves += 1
+        return won
+
+    def undo(self, cell, turn):
+        counts = self.counts[turn]
+        for line in self.game.cell_lines[cell]:
+            self.remove_line(line)
+            counts[line] -= 1
+            self.add_line(line)
+        self.cells[cell] = EMPTY
+        self.moves -= 1
+
+    def candidates(self):
+        return [cell for cell in self.game.order if self.cells[cell] == EMPTY]
+
+    def root(self, turn, depth, moves):
+        """
+        Searches moves, in order, to depth plies. Returns the value of
+        the best one for turn, and the move.
+        """
+        alpha = -2 * self.game.win
+        best = None
+        for cell in moves:
+            v = self.child(cell, turn, depth, 0, alpha, 2 * self.game.win)
+            if best is None or v > alpha:
+                alpha, best = v, cell
+        return alpha, best
+
+    def child(self, cell, turn, depth, ply, alpha, beta):
+        """
+        Returns the value to turn of moving at cell, searched to depth.
+        """
+        if self.play(cell, turn):
+            # Sooner wins are better
+            v = self.game.win - ply - 1
+        else:
+            v = -self.negamax(O if turn == X else X, depth - 1, ply + 1,
+                              -beta, -alpha)
+        self.undo(cell, turn)
+        return v
+
+    def negamax(self, turn, depth, ply, alpha, beta):
+        """
+        Returns the value of the board to turn, the player to move,
+        searched to depth plies with alpha-beta pruning.
+        """
+        self.nodes += 1
+        if (self.nodes % CHECK_INTERVAL == 0
+                and time.perf_counter() > self.deadline):
+            raise Timeout
+
+        if self.moves == len(self.cells):
+            return 0
+        if depth == 0:
+            if self.threats[turn]:
+                return self.game.win - ply - 1
+            return self.score if turn == X else -self.score
+
+        best = -2 * self.game.win
+        for cell in self.candidates():
+            v = self.child(cell, turn, depth, ply, alpha, beta)
+            if v > best:
+                best = v
+                if v > alpha:
+                    alpha = v
+                    if alpha >= beta:
+                        break
+        return best
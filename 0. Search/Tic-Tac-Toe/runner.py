@@ -1,12 +1,26 @@
+import argparse
 import pygame
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import tictactoe as ttt
 
+parser = argparse.ArgumentParser(description="Play Tic-Tac-Toe")
+parser.add_argument(
+    "--frame-times", action="store_true",
+    help="print how long frames took while the computer was thinking"
+)
+args = parser.parse_args()
+
 pygame.init()
 size = width, height = 600, 400
 
+# Frames drawn per second, and the least time the computer takes to move
+# so that its moves do not appear instantly
+FPS = 60
+AI_DELAY = 0.5
+
 # Colors
 black = (0, 0, 0)
 white = (255, 255, 255)
@@ -17,14 +31,23 @@ mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
 moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
 
+clock = pygame.time.Clock()
+
+# The computer searches on a worker thread while frames keep being drawn
+executor = ThreadPoolExecutor(max_workers=1)
+
 user = None
 board = ttt.initial_state()
-ai_turn = False
+ai_move = None
+ai_started = None
+ai_frames = []
 
 while True:
 
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            # Drop any search not yet started rather than wait for it
+            executor.shutdown(wait=False, cancel_futures=True)
             sys.exit()
 
     screen.fill(black)
@@ -102,7 +125,8 @@ while True:
         elif user == player:
             title = f"Play as {user}"
         else:
-            title = f"Computer thinking..."
+            dots = "." * (1 + pygame.time.get_ticks() // 300 % 3)
+            title = f"Computer thinking{dots:<3}"
         title = largeFont.render(title, True, white)
         titleRect = title.get_rect()
         titleRect.center = ((width / 2), 30)
@@ -110,13 +134,18 @@ while True:
 
         # Check for AI move
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
-                board = ttt.result(board, move)
-                ai_turn = False
-            else:
-                ai_turn = True
+            if ai_move is None:
+                ai_started = time.perf_counter()
+                ai_frames = []
+                ai_move = executor.submit(ttt.minimax, board)
+            elif (ai_move.done()
+                    and time.perf_counter() - ai_started >= AI_DELAY):
+                board = ttt.result(board, ai_move.result())
+                ai_move = None
+                if args.frame_times and ai_frames:
+                    print(f"AI move: {len(ai_frames)} frames, "
+                          f"mean {sum(ai_frames) / len(ai_frames):.1f}ms, "
+                          f"max {max(ai_frames)}ms")
 
         # Check for a user move
         click, _, _ = pygame.mouse.get_pressed()
@@ -141,6 +170,11 @@ while True:
                     time.sleep(0.2)
                     user = None
                     board = ttt.initial_state()
-                    ai_turn = False
+                    ai_move = None
 
     pygame.display.flip()
+
+    # Wait out the rest of the frame, noting its length if the AI is busy
+    frame_time = clock.tick(FPS)
+    if ai_move is not None:
+        ai_frames.append(frame_time)
@@ -4,11 +4,66 @@ Tic Tac Toe Player
 
 import math
 import copy
+import os
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# The 8 symmetries of the board (4 rotations, each optionally mirrored),
+# each listing which cell, numbered 0-8 in reading order, lands on each cell
+SYMMETRIES = [
+    (0, 1, 2, 3, 4, 5, 6, 7, 8),
+    (6, 3, 0, 7, 4, 1, 8, 5, 2),
+    (8, 7, 6, 5, 4, 3, 2, 1, 0),
+    (2, 5, 8, 1, 4, 7, 0, 3, 6),
+    (2, 1, 0, 5, 4, 3, 8, 7, 6),
+    (0, 3, 6, 1, 4, 7, 2, 5, 8),
+    (6, 7, 8, 3, 4, 5, 0, 1, 2),
+    (8, 5, 2, 7, 4, 1, 6, 3, 0),
+]
+
+# Every row, column and diagonal, as lists of cells
+LINES = (
+    [[(i, j) for j in range(3)] for i in range(3)]
+    + [[(i, j) for i in range(3)] for j in range(3)]
+    + [[(i, i) for i in range(3)], [(2 - i, i) for i in range(3)]]
+)
+
+# Indices in LINES of the lines through each cell
+CELL_LINES = {
+    (i, j): [n for n, line in enumerate(LINES) if (i, j) in line]
+    for i in range(3) for j in range(3)
+}
+
+# How much a piece of each player adds to the count of a line
+SIGNS = {X: 1, O: -1}
+
+# Order tried for moves that neither win nor block: center, corners, edges
+PREFERENCE = {
+    (1, 1): 0,
+    (0, 0): 1, (0, 2): 1, (2, 0): 1, (2, 2): 1,
+    (0, 1): 2, (1, 0): 2, (1, 2): 2, (2, 1): 2,
+}
+
+# Digit used for each cell when a board is written as a base 3 number
+CODES = {EMPTY: 0, X: 1, O: 2}
+
+# Maps the canonical key of every board solved so far to its minimax value,
+# and is kept between calls so each position is only ever solved once
+transpositions = {}
+
+# The opening book written by book.py: BOOK_MAGIC then one byte for each
+# board, at its board_index, holding the optimal cell (0-8 in reading
+# order, or NO_MOVE at the end of a game) in its low 4 bits and the
+# minimax value plus 1 in the next 2. Boards that cannot arise in play
+# hold UNREACHABLE.
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         "tictactoe.book")
+BOOK_MAGIC = b"TTTBOOK\x01"
+NO_MOVE = 15
+UNREACHABLE = 255
+
 
 def initial_state():
     """
@@ -128,18 +183,275 @@ def utility(board):
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
 
-    if player(board) == -1:
-        return 0
-    elif winner(board) == X:
+    # A full board can still have a winner, so check for one first
+    won = winner(board)
+    if won == X:
         return 1
-    else: # winner is O
+    elif won == O:
         return -1
+    else: # tie
+        return 0
+
+
+def board_index(board):
+    """
+    Returns the board written as a base 3 number, cell 0 the lowest digit.
+    """
+    index = 0
+    for row in reversed(board):
+        for cell in reversed(row):
+            index = index * 3 + CODES[cell]
+    return index
+
+
+def load_book(path=BOOK_PATH):
+    """
+    Returns the opening book at path, or None if it has not been built.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if data[:len(BOOK_MAGIC)] != BOOK_MAGIC:
+        return None
+    table = data[len(BOOK_MAGIC):]
+    return table if len(table) == 3 ** 9 else None
+
+
+book = load_book()
+
+
+def book_entry(board):
+    """
+    Returns (action, value) for the board from the opening book, or None
+    if there is no book or the board is not in it.
+    """
+    if book is None:
+        return None
+    entry = book[board_index(board)]
+    if entry == UNREACHABLE:
+        return None
+    cell = entry & 15
+    return (None if cell == NO_MOVE else divmod(cell, 3)), (entry >> 4) - 1
+
+
+class GameState():
+    """
+    A board being searched, along with the number of moves made, the
+    last move, and for every line the number of X pieces in it less the
+    number of O pieces. Moves are made and taken back in place, and
+    whether a move won is found from the at most 4 lines through it.
+    """
+
+    def __init__(self, board):
+        self.board = [row[:] for row in board]
+        self.moves = 0
+        self.last = None
+        self.lines = [0] * len(LINES)
+        self.won = winner(board)
+        for i, row in enumerate(board):
+            for j, cell in enumerate(row):
+                if cell != EMPTY:
+                    self.moves += 1
+                    for line in CELL_LINES[(i, j)]:
+                        self.lines[line] += SIGNS[cell]
+
+    def player(self):
+        """
+        Returns player who has the next turn, or None if the game is over.
+        """
+        if self.won is not None or self.moves == 9:
+            return None
+        return X if self.moves % 2 == 0 else O
+
+    def actions(self):
+        return [(i, j) for i in range(3) for j in range(3)
+                if self.board[i][j] == EMPTY]
+
+    def terminal(self):
+        return self.won is not None or self.moves == 9
+
+    def play(self, action):
+        """
+        Makes the next player's move at action. Returns what undo needs
+        to take it back.
+        """
+        turn = X if self.moves % 2 == 0 else O
+        sign = SIGNS[turn]
+        undo = (action, self.last, self.won)
+        self.board[action[0]][action[1]] = turn
+        self.moves += 1
+        self.last = action
+        for line in CELL_LINES[action]:
+            self.lines[line] += sign
+            if self.lines[line] == 3 * sign:
+                self.won = turn
+        return undo
+
+    def undo(self, undo):
+        action, self.last, self.won = undo
+        self.moves -= 1
+        sign = SIGNS[X if self.moves % 2 == 0 else O]
+        self.board[action[0]][action[1]] = EMPTY
+        for line in CELL_LINES[action]:
+            self.lines[line] -= sign
+
+    def completes_line(self, action, turn):
+        """
+        Returns True if turn moving at action would make three in a row.
+        """
+        return any(self.lines[line] == 2 * SIGNS[turn]
+                   for line in CELL_LINES[action])
+
+    def value(self):
+        """
+        Returns the minimax value of the state: 1 if X wins with best
+        play, -1 if O does, 0 for a tie.
+        """
+        key = canonical_key(self.board)
+        if key in transpositions:
+            return transpositions[key]
+
+        if self.won is not None:
+            v = SIGNS[self.won]
+        elif self.moves == 9:
+            v = 0
+        else:
+            values = []
+            for action in self.actions():
+                undo = self.play(action)
+                values.append(self.value())
+                self.undo(undo)
+            v = max(values) if self.moves % 2 == 0 else min(values)
+
+        transpositions[key] = v
+        return v
+
+    def ordered_actions(self):
+        """
+        Returns the possible actions for the next player, most promising
+        first: moves that win, then moves that block the opponent from
+        winning, then the center, corners and edges.
+        """
+        turn = X if self.moves % 2 == 0 else O
+        opponent = O if turn == X else X
+
+        def rank(action):
+            if self.completes_line(action, turn):
+                return (0, action)
+            if self.completes_line(action, opponent):
+                return (1, action)
+            return (2 + PREFERENCE[action], action)
+
+        return sorted(self.actions(), key=rank)
+
+    def alphabeta_value(self, alpha, beta):
+        """
+        Returns the minimax value of the state if it lies strictly
+        between alpha and beta, otherwise a bound on it beyond whichever
+        it crossed.
+        """
+        if self.won is not None:
+            return SIGNS[self.won]
+        if self.moves == 9:
+            return 0
+
+        if self.moves % 2 == 0:
+            v = -1
+            for action in self.ordered_actions():
+                undo = self.play(action)
+                v = max(v, self.alphabeta_value(alpha, beta))
+                self.undo(undo)
+                alpha = max(alpha, v)
+                # Also stops at once on a forced win, as beta is at most 1
+                if alpha >= beta:
+                    break
+        else:
+            v = 1
+            for action in self.ordered_actions():
+                undo = self.play(action)
+                v = min(v, self.alphabeta_value(alpha, beta))
+                self.undo(undo)
+                beta = min(beta, v)
+                if alpha >= beta:
+                    break
+        return v
+
+
+def canonical_key(board):
+    """
+    Returns a number identifying the board up to rotation and reflection,
+    the same for all 8 symmetric versions of it.
+    """
+    cells = [CODES[cell] for row in board for cell in row]
+    return min(
+        sum(cells[cell] * 3 ** i for i, cell in enumerate(symmetry))
+        for symmetry in SYMMETRIES
+    )
+
+
+def value(board):
+    """
+    Returns the minimax value of the board: 1 if X wins with best play,
+    -1 if O does, 0 for a tie.
+    """
+    return GameState(board).value()
 
 
 def minimax(board):
     """
     Returns the optimal action for the current player on the board.
     """
+    entry = book_entry(board)
+    if entry is not None:
+        return entry[0]
+
+    state = GameState(board)
+    if state.terminal():
+        return None
+
+    values = {}
+    for action in state.actions():
+        undo = state.play(action)
+        values[action] = state.value()
+        state.undo(undo)
+    best = max if state.player() == X else min
+    return best(sorted(values), key=values.get)
+
+
+def alphabeta(board):
+    """
+    Returns the optimal action for the current player on the board,
+    using alpha-beta pruning with winning, blocking, center and corner
+    moves tried first.
+    """
+    state = GameState(board)
+    if state.terminal():
+        return None
+
+    turn = state.player()
+    optimal = None
+    best = -2 if turn == X else 2
+    for action in state.ordered_actions():
+        undo = state.play(action)
+        if turn == X:
+            v = state.alphabeta_value(best, 1)
+        else:
+            v = state.alphabeta_value(-1, best)
+        state.undo(undo)
+        if (v > best) if turn == X else (v < best):
+            best, optimal = v, action
+            if best == SIGNS[turn]:
+                break
+    return optimal
+
+
+def exhaustive_minimax(board):
+    """
+    Returns the optimal action for the current player on the board,
+    searching the whole game tree without remembering any positions.
+    """
     # check if board is terminal board
     if terminal(board):
         return None
@@ -0,0 +1,389 @@
+"""
+Benchmarks for model checking.
+
+Besides the puzzles in puzzle.py, knowledge bases are generated for
+islands of any number of people, each of whom is a knight or a knave and
+makes a random claim about a few of the others.
+
+Usage: python benchmark.py backends [--people N ...] [--seed N]
+       python benchmark.py compile [--people N ...] [--models N]
+       python benchmark.py intern [--people N ...] [--claims N]
+       python benchmark.py queries [--people N ...] [--queries N]
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+
+import logic
+import puzzle
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+
+def synthetic_knowledge(people, seed=0):
+    """
+    Returns the knowledge base of a generated island of people, and the
+    list of its symbols. The claims are taken from an assignment of
+    knights and knaves chosen at random, so the knowledge base is always
+    consistent.
+    """
+    rng = random.Random(seed)
+    knights = [Symbol(f"{i} is a Knight") for i in range(people)]
+    knaves = [Symbol(f"{i} is a Knave") for i in range(people)]
+    truth = [rng.random() < 0.5 for _ in range(people)]
+
+    def claim(depth):
+        """
+        Returns a random claim about the people and whether it is true.
+        """
+        if depth == 0 or rng.random() < 0.3:
+            i = rng.randrange(people)
+            if rng.random() < 0.5:
+                return knights[i], truth[i]
+            return knaves[i], not truth[i]
+        kind = rng.choice(["and", "or", "not", "implies", "iff"])
+        if kind == "not":
+            sentence, value = claim(depth - 1)
+            return Not(sentence), not value
+        (left, a), (right, b) = claim(depth - 1), claim(depth - 1)
+        if kind == "and":
+            return And(left, right), a and b
+        if kind == "or":
+            return Or(left, right), a or b
+        if kind == "implies":
+            return Implication(left, right), not a or b
+        return Biconditional(left, right), a == b
+
+    knowledge = And()
+    for i in range(people):
+        knowledge.add(And(Or(knights[i], knaves[i]),
+                          Not(And(knights[i], knaves[i]))))
+        sentence, value = claim(2)
+        # Knights only make true claims and knaves only false ones
+        if value != truth[i]:
+            sentence = Not(sentence)
+        knowledge.add(Implication(knights[i], sentence))
+        knowledge.add(Implication(knaves[i], Not(sentence)))
+    return knowledge, knights + knaves
+
+
+def restated_knowledge(people, claims, seed=0):
+    """
+    Returns the knowledge base of a generated island where each person
+    makes claims of whether two others are the same kind, in the style
+    of puzzle.py, and the list of its symbols. Every sentence is built
+    afresh, as when written out by hand, so the rules of the puzzle and
+    the claims repeat many times over.
+    """
+    rng = random.Random(seed)
+    truth = [rng.random() < 0.5 for _ in range(people)]
+
+    def knight(i):
+        return Symbol(f"{i} is a Knight")
+
+    def knave(i):
+        return Symbol(f"{i} is a Knave")
+
+    def rules(i):
+        return And(Or(knight(i), knave(i)), Not(And(knight(i), knave(i))))
+
+    knowledge = And()
+    for i in range(people):
+        knowledge.add(rules(i))
+        for _ in range(claims):
+            # Claims are about near neighbors, so the same ones recur
+            j, k = (rng.randrange(i, i + 4) % people for _ in range(2))
+            same = Or(And(knight(j), knight(k)), And(knave(j), knave(k)))
+            # Knights only make true claims and knaves only false ones
+            if (truth[j] == truth[k]) != truth[i]:
+                same = Not(same)
+            knowledge.add(And(rules(j), rules(k)))
+            knowledge.add(Implication(knight(i), same))
+            knowledge.add(Implication(knave(i), Not(same)))
+    return knowledge, sorted(knowledge.symbols())
+
+
+def puzzle_knowledge():
+    """
+    Returns (name, knowledge, symbols) for every puzzle in puzzle.py.
+    """
+    symbols = [puzzle.AKnight, puzzle.AKnave, puzzle.BKnight,
+               puzzle.BKnave, puzzle.CKnight, puzzle.CKnave]
+    return [(f"puzzle {i}", getattr(puzzle, f"knowledge{i}"), symbols)
+            for i in range(4)]
+
+
+def knowledge_bases(args):
+    """
+    Returns (name, knowledge, symbols) for the puzzles and for a
+    generated island of each size in args.people.
+    """
+    bases = puzzle_knowledge()
+    for people in args.people:
+        knowledge, symbols = synthetic_knowledge(people, args.seed)
+        bases.append((f"{people} people", knowledge, symbols))
+    return bases
+
+
+def time_backend(name, knowledge, symbols):
+    """
+    Returns the symbols entailed by knowledge using the named model_check
+    backend, and the seconds taken.
+    """
+    check = logic.BACKENDS[name]
+    start = time.perf_counter()
+    entailed = [symbol for symbol in symbols if check(knowledge, symbol)]
+    return entailed, time.perf_counter() - start
+
+
+def runs(backend, symbols, args):
+    """
+    Returns True if the backend should be timed on this many symbols.
+    """
+    if backend in ("enumerate", "compiled"):
+        return symbols <= args.max_enumerate
+    if backend == "numpy":
+        return logic.numpy is not None and symbols <= args.max_table
+    return True
+
+
+def bench_backends(args):
+    """
+    Times each model_check backend answering whether every symbol is
+    entailed, skipping enumeration above --max-enumerate symbols and
+    truth tables above --max-table.
+    """
+    for name, knowledge, symbols in knowledge_bases(args):
+        line = f"{name:>12} ({len(symbols):>4} symbols):"
+        answers = {}
+        for backend in logic.BACKENDS:
+            if not runs(backend, len(symbols), args):
+                line += f"  {backend} skipped"
+                continue
+            answers[backend], seconds = time_backend(backend, knowledge,
+                                                     symbols)
+            line += f"  {backend} {seconds:9.4f}s"
+        if len({tuple(entailed) for entailed in answers.values()}) > 1:
+            raise Exception(f"backends disagree on {name}")
+        entailed = next(iter(answers.values()))
+        print(f"{line}  {len(entailed)} entailed")
+
+
+def bench_compile(args):
+    """
+    Times evaluating each knowledge base in random models by walking the
+    sentence tree with a dict model, and compiled with the model packed
+    into an integer or a list.
+    """
+    rng = random.Random(args.seed)
+    for name, knowledge, _ in knowledge_bases(args):
+        symbols = sorted(knowledge.symbols())
+        packed = [rng.getrandbits(len(symbols)) for _ in range(args.models)]
+
+        start = time.perf_counter()
+        compiled = logic.Compiled(knowledge, symbols)
+        as_list = logic.Compiled(knowledge, symbols, packed=False)
+        compile_seconds = time.perf_counter() - start
+
+        dicts = [{name: bool(m >> i & 1) for i, name in enumerate(symbols)}
+                 for m in packed]
+        lists = [[bool(m >> i & 1) for i in range(len(symbols))]
+                 for m in packed]
+        times = {}
+        answers = {}
+        for method, evaluate, models in [
+            ("tree", knowledge.evaluate, dicts),
+            ("int", compiled.evaluate, packed),
+            ("list", as_list.evaluate, lists)
+        ]:
+            start = time.perf_counter()
+            answers[method] = [bool(evaluate(model)) for model in models]
+            times[method] = (time.perf_counter() - start) / len(models)
+        if len({tuple(answer) for answer in answers.values()}) > 1:
+            raise Exception(f"compiled evaluation disagrees on {name}")
+
+        print(f"{name:>12} ({len(symbols):>4} symbols): "
+              f"compile {compile_seconds * 1000:7.2f}ms  " + "  ".join(
+                  f"{method} {seconds * 1e6:8.2f}us"
+                  f" ({times['tree'] / seconds:5.1f}x)"
+                  for method, seconds in times.items()
+              ))
+
+
+def count_nodes(sentence):
+    """
+    Returns the number of nodes in the sentence, counting each time a
+    node appears, and the number of distinct node objects.
+    """
+    total = 0
+    distinct = set()
+    stack = [sentence]
+    while stack:
+        node = stack.pop()
+        total += 1
+        distinct.add(id(node))
+        if isinstance(node, logic.Not):
+            stack.append(node.operand)
+        elif isinstance(node, (logic.And, logic.Or)):
+            stack.extend(node.conjuncts if isinstance(node, logic.And)
+                         else node.disjuncts)
+        elif isinstance(node, logic.Implication):
+            stack.extend([node.antecedent, node.consequent])
+        elif isinstance(node, logic.Biconditional):
+            stack.extend([node.left, node.right])
+    return total, len(distinct)
+
+
+def measure(build):
+    """
+    Returns what build returns, and the bytes it leaves allocated.
+    """
+    tracemalloc.start()
+    try:
+        result = build()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, size
+
+
+def bench_intern(args):
+    """
+    Compares plain and interned knowledge bases of restated islands on
+    memory, hashing, finding symbols, and encoding for the SAT solver.
+    """
+    for people in args.people:
+        (plain, _), plain_bytes = measure(
+            lambda: restated_knowledge(people, args.claims, args.seed)
+        )
+        interned, interned_bytes = measure(
+            lambda: logic.intern(
+                restated_knowledge(people, args.claims, args.seed)[0]
+            )
+        )
+        total, distinct_plain = count_nodes(plain)
+        _, distinct_interned = count_nodes(interned)
+        print(f"{people:>5} people: {total:>8} nodes, {distinct_plain:>8} "
+              f"objects plain, {distinct_interned:>7} interned  "
+              f"{plain_bytes / 2 ** 20:7.2f}MB plain, "
+              f"{interned_bytes / 2 ** 20:6.2f}MB interned")
+
+        for name, operation in [
+            ("hash", hash),
+            ("symbols", lambda knowledge: knowledge.symbols()),
+            ("encode", lambda knowledge: logic.CNF().add(knowledge))
+        ]:
+            times = []
+            for knowledge in (plain, interned):
+                start = time.perf_counter()
+                for _ in range(args.repeat):
+                    operation(knowledge)
+                times.append((time.perf_counter() - start) / args.repeat)
+            print(f"{name:>16}: plain {times[0] * 1000:9.3f}ms  "
+                  f"interned {times[1] * 1000:9.3f}ms  "
+                  f"{times[0] / times[1]:8.1f}x")
+
+
+def random_queries(symbols, count, seed=0):
+    """
+    Returns the symbols and their negations, then random pairs of them
+    joined by And or Or, up to count queries in all.
+    """
+    rng = random.Random(seed)
+    literals = list(symbols) + [Not(symbol) for symbol in symbols]
+    queries = literals[:count]
+    while len(queries) < count:
+        kind = rng.choice([And, Or])
+        queries.append(kind(rng.choice(literals), rng.choice(literals)))
+    return queries
+
+
+def bench_queries(args):
+    """
+    Times answering many queries against each knowledge base with one
+    call to model_check per query, and with entailed_symbols using each
+    backend that answers them all at once.
+    """
+    for name, knowledge, symbols in knowledge_bases(args):
+        queries = random_queries(symbols, args.queries, args.seed)
+        line = f"{name:>12} ({len(symbols):>4} symbols):"
+        answers = {}
+        times = {}
+        methods = [("each", "auto", lambda: [
+            query for query in queries
+            if logic.model_check(knowledge, query)
+        ])]
+        for backend in logic.ENTAILMENT:
+            methods.append((backend, backend, lambda: (
+                logic.entailed_symbols(knowledge, queries)
+            )))
+        for method, backend, run in methods:
+            if not runs(backend, len(symbols), args):
+                line += f"  {method} skipped"
+                continue
+            saved, logic.backend = logic.backend, backend
+            try:
+                start = time.perf_counter()
+                answers[method] = run()
+                times[method] = time.perf_counter() - start
+            finally:
+                logic.backend = saved
+            line += f"  {method} {times[method]:8.4f}s"
+        if len({tuple(entailed) for entailed in answers.values()}) > 1:
+            raise Exception(f"entailed_symbols disagrees on {name}")
+        entailed = next(iter(answers.values()))
+        print(f"{line}  {len(entailed)} of {len(queries)} entailed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    # Options shared by every benchmark of generated knowledge bases
+    islands = argparse.ArgumentParser(add_help=False)
+    islands.add_argument("--people", metavar="N", type=int, nargs="+",
+                         default=[4, 8, 16, 64],
+                         help="sizes of generated islands")
+    islands.add_argument("--seed", type=int, default=0)
+
+    backends = commands.add_parser("backends", parents=[islands],
+                                   help="compare model_check backends")
+    backends.add_argument(
+        "--max-enumerate", type=int, default=16,
+        help="most symbols to try every model of, compiled or not"
+    )
+    backends.add_argument("--max-table", type=int, default=24,
+                          help="most symbols to build a truth table for")
+    backends.set_defaults(run=bench_backends)
+
+    compiling = commands.add_parser("compile", parents=[islands],
+                                    help="compare compiled evaluation")
+    compiling.add_argument("--models", type=int, default=2000,
+                           help="random models to evaluate in")
+    compiling.set_defaults(run=bench_compile)
+
+    interning = commands.add_parser("intern", parents=[islands],
+                                    help="compare interned sentences")
+    interning.add_argument("--claims", type=int, default=4,
+                           help="claims made by each person")
+    interning.add_argument("--repeat", type=int, default=5,
+                           help="times to repeat each operation")
+    interning.set_defaults(run=bench_intern)
+
+    answering = commands.add_parser("queries", parents=[islands],
+                                    help="compare answering many queries")
+    answering.add_argument("--queries", type=int, default=200,
+                           help="queries to ask of each knowledge base")
+    answering.add_argument("--max-enumerate", type=int, default=16,
+                           help="most symbols to try every model of")
+    answering.add_argument("--max-table", type=int, default=24,
+                           help="most symbols to build a truth table for")
+    answering.set_defaults(run=bench_queries)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
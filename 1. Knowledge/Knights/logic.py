@@ -1,7 +1,18 @@
 import itertools
+import weakref
+
+from sat import Solver
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 class Sentence():
+    # Interned sentences set _hash and _symbols, None until then, and
+    # never change
+    __slots__ = ("_hash", "_symbols", "__weakref__")
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
@@ -12,8 +23,31 @@ class Sentence():
         return ""
 
     def symbols(self):
-        """Returns a set of all symbols in the logical sentence."""
-        return set()
+        """Returns a frozenset of all symbols in the logical sentence."""
+        return frozenset()
+
+    def encode(self, cnf):
+        """
+        Adds clauses to cnf defining a new variable to be true exactly
+        when the sentence is, and returns its literal.
+        """
+        raise Exception("nothing to encode")
+
+    def expression(self, slots, packed=True):
+        """
+        Returns Python source for the truth of the sentence in a model m,
+        where the symbol named name is bit slots[name] of the integer m if
+        packed, otherwise item slots[name] of the sequence m.
+        """
+        raise Exception("nothing to compile")
+
+    def truth_table(self, columns):
+        """
+        Returns the truth of the sentence in every row of a truth table,
+        given columns mapping each symbol name to a NumPy boolean array
+        or scalar, as one array (or scalar if every column is).
+        """
+        raise Exception("nothing to evaluate")
 
     @classmethod
     def validate(cls, sentence):
@@ -43,14 +77,19 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
 
     def __init__(self, name):
         self.name = name
+        self._hash = None
+        self._symbols = None
 
     def __eq__(self, other):
         return isinstance(other, Symbol) and self.name == other.name
 
     def __hash__(self):
+        if self._hash is not None:
+            return self._hash
         return hash(("symbol", self.name))
 
     def __repr__(self):
@@ -66,18 +105,42 @@ class Symbol(Sentence):
         return self.name
 
     def symbols(self):
-        return {self.name}
+        if self._symbols is not None:
+            return self._symbols
+        return frozenset([self.name])
+
+    def encode(self, cnf):
+        return cnf.variable(self.name)
+
+    def expression(self, slots, packed=True):
+        try:
+            slot = slots[self.name]
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
+        return f"(m >> {slot} & 1)" if packed else f"m[{slot}]"
+
+    def truth_table(self, columns):
+        try:
+            return columns[self.name]
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
 
 
 class Not(Sentence):
+    __slots__ = ("operand",)
+
     def __init__(self, operand):
         Sentence.validate(operand)
         self.operand = operand
+        self._hash = None
+        self._symbols = None
 
     def __eq__(self, other):
         return isinstance(other, Not) and self.operand == other.operand
 
     def __hash__(self):
+        if self._hash is not None:
+            return self._hash
         return hash(("not", hash(self.operand)))
 
     def __repr__(self):
@@ -90,19 +153,36 @@ class Not(Sentence):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
     def symbols(self):
+        if self._symbols is not None:
+            return self._symbols
         return self.operand.symbols()
 
+    def encode(self, cnf):
+        return -cnf.literal(self.operand)
+
+    def expression(self, slots, packed=True):
+        return f"(not {self.operand.expression(slots, packed)})"
+
+    def truth_table(self, columns):
+        return ~self.operand.truth_table(columns)
+
 
 class And(Sentence):
+    __slots__ = ("conjuncts",)
+
     def __init__(self, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
         self.conjuncts = list(conjuncts)
+        self._hash = None
+        self._symbols = None
 
     def __eq__(self, other):
         return isinstance(other, And) and self.conjuncts == other.conjuncts
 
     def __hash__(self):
+        if self._hash is not None:
+            return self._hash
         return hash(
             ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
         )
@@ -115,6 +195,8 @@ class And(Sentence):
 
     def add(self, conjunct):
         Sentence.validate(conjunct)
+        if self._hash is not None:
+            raise TypeError("interned sentences cannot be changed")
         self.conjuncts.append(conjunct)
 
     def evaluate(self, model):
@@ -127,19 +209,49 @@ class And(Sentence):
                            for conjunct in self.conjuncts])
 
     def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+        if self._symbols is not None:
+            return self._symbols
+        return frozenset().union(
+            *[conjunct.symbols() for conjunct in self.conjuncts]
+        )
+
+    def encode(self, cnf):
+        literals = [cnf.literal(conjunct) for conjunct in self.conjuncts]
+        v = cnf.fresh()
+        for literal in literals:
+            cnf.clauses.append([-v, literal])
+        cnf.clauses.append([v] + [-literal for literal in literals])
+        return v
+
+    def expression(self, slots, packed=True):
+        if not self.conjuncts:
+            return "True"
+        return "(" + " and ".join(conjunct.expression(slots, packed)
+                                  for conjunct in self.conjuncts) + ")"
+
+    def truth_table(self, columns):
+        result = numpy.bool_(True)
+        for conjunct in self.conjuncts:
+            result = result & conjunct.truth_table(columns)
+        return result
 
 
 class Or(Sentence):
+    __slots__ = ("disjuncts",)
+
     def __init__(self, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
         self.disjuncts = list(disjuncts)
+        self._hash = None
+        self._symbols = None
 
     def __eq__(self, other):
         return isinstance(other, Or) and self.disjuncts == other.disjuncts
 
     def __hash__(self):
+        if self._hash is not None:
+            return self._hash
         return hash(
             ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
         )
@@ -158,15 +270,43 @@ class Or(Sentence):
                             for disjunct in self.disjuncts])
 
     def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+        if self._symbols is not None:
+            return self._symbols
+        return frozenset().union(
+            *[disjunct.symbols() for disjunct in self.disjuncts]
+        )
+
+    def encode(self, cnf):
+        literals = [cnf.literal(disjunct) for disjunct in self.disjuncts]
+        v = cnf.fresh()
+        for literal in literals:
+            cnf.clauses.append([v, -literal])
+        cnf.clauses.append([-v] + literals)
+        return v
+
+    def expression(self, slots, packed=True):
+        if not self.disjuncts:
+            return "False"
+        return "(" + " or ".join(disjunct.expression(slots, packed)
+                                 for disjunct in self.disjuncts) + ")"
+
+    def truth_table(self, columns):
+        result = numpy.bool_(False)
+        for disjunct in self.disjuncts:
+            result = result | disjunct.truth_table(columns)
+        return result
 
 
 class Implication(Sentence):
+    __slots__ = ("antecedent", "consequent")
+
     def __init__(self, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
         self.antecedent = antecedent
         self.consequent = consequent
+        self._hash = None
+        self._symbols = None
 
     def __eq__(self, other):
         return (isinstance(other, Implication)
@@ -174,7 +314,11 @@ class Implication(Sentence):
                 and self.consequent == other.consequent)
 
     def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+        if self._hash is not None:
+            return self._hash
+        return hash(
+            ("implies", hash(self.antecedent), hash(self.consequent))
+        )
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -189,15 +333,37 @@ class Implication(Sentence):
         return f"{antecedent} => {consequent}"
 
     def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+        if self._symbols is not None:
+            return self._symbols
+        return self.antecedent.symbols() | self.consequent.symbols()
+
+    def encode(self, cnf):
+        a = cnf.literal(self.antecedent)
+        b = cnf.literal(self.consequent)
+        v = cnf.fresh()
+        cnf.clauses.extend([[-v, -a, b], [v, a], [v, -b]])
+        return v
+
+    def expression(self, slots, packed=True):
+        antecedent = self.antecedent.expression(slots, packed)
+        consequent = self.consequent.expression(slots, packed)
+        return f"(not {antecedent} or {consequent})"
+
+    def truth_table(self, columns):
+        return (~self.antecedent.truth_table(columns)
+                | self.consequent.truth_table(columns))
 
 
 class Biconditional(Sentence):
+    __slots__ = ("left", "right")
+
     def __init__(self, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
         self.left = left
         self.right = right
+        self._hash = None
+        self._symbols = None
 
     def __eq__(self, other):
         return (isinstance(other, Biconditional)
@@ -205,6 +371,8 @@ class Biconditional(Sentence):
                 and self.right == other.right)
 
     def __hash__(self):
+        if self._hash is not None:
+            return self._hash
         return hash(("biconditional", hash(self.left), hash(self.right)))
 
     def __repr__(self):
@@ -222,11 +390,355 @@ class Biconditional(Sentence):
         return f"{left} <=> {right}"
 
     def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
+        if self._symbols is not None:
+            return self._symbols
+        return self.left.symbols() | self.right.symbols()
+
+    def encode(self, cnf):
+        a = cnf.literal(self.left)
+        b = cnf.literal(self.right)
+        v = cnf.fresh()
+        cnf.clauses.extend([[-v, -a, b], [-v, a, -b],
+                            [v, a, b], [v, -a, -b]])
+        return v
+
+    def expression(self, slots, packed=True):
+        # Every expression is 0, 1, False or True, so == compares truth
+        left = self.left.expression(slots, packed)
+        right = self.right.expression(slots, packed)
+        return f"({left} == {right})"
+
+    def truth_table(self, columns):
+        left = self.left.truth_table(columns)
+        right = self.right.truth_table(columns)
+        return left == right
+
+
+# Every interned sentence still in use, by its kind and parts
+interned = weakref.WeakValueDictionary()
+
+
+def intern(sentence):
+    """
+    Returns the interned sentence equal to sentence. Equal interned
+    sentences are one and the same object, which cannot be changed and
+    knows its hash and symbols, so repeated parts of a knowledge base
+    are stored, hashed and compared only once.
+    """
+    if sentence._hash is not None:
+        return sentence
+
+    if isinstance(sentence, Symbol):
+        parts = (sentence.name,)
+    elif isinstance(sentence, Not):
+        parts = (intern(sentence.operand),)
+    elif isinstance(sentence, And):
+        parts = tuple(intern(conjunct) for conjunct in sentence.conjuncts)
+    elif isinstance(sentence, Or):
+        parts = tuple(intern(disjunct) for disjunct in sentence.disjuncts)
+    elif isinstance(sentence, Implication):
+        parts = (intern(sentence.antecedent), intern(sentence.consequent))
+    elif isinstance(sentence, Biconditional):
+        parts = (intern(sentence.left), intern(sentence.right))
+    else:
+        raise TypeError("must be a logical sentence")
+
+    key = (type(sentence), parts)
+    node = interned.get(key)
+    if node is None:
+        node = type(sentence)(*parts)
+        # Computed from the parts, whose own are already cached
+        node._hash = hash(node)
+        node._symbols = node.symbols()
+        interned[key] = node
+    return node
+
+
+class Compiled():
+    """
+    A sentence compiled into one Python expression, so evaluating it
+    makes no method calls and no dict lookups. Symbols are numbered in
+    the order of symbols, and evaluate takes a model packed into an
+    integer with bit i set if symbol i is true, or a list of truth
+    values if packed is False.
+    """
+
+    def __init__(self, sentence, symbols=None, packed=True):
+        if symbols is None:
+            symbols = sorted(sentence.symbols())
+        self.symbols = list(symbols)
+        self.slots = {name: i for i, name in enumerate(self.symbols)}
+        self.packed = packed
+        self.source = sentence.expression(self.slots, packed)
+        self.evaluate = eval(f"lambda m: {self.source}")
+
+    def pack(self, model):
+        """
+        Returns the model dict packed as evaluate expects.
+        """
+        if self.packed:
+            return sum(1 << i for i, name in enumerate(self.symbols)
+                       if model[name])
+        return [bool(model[name]) for name in self.symbols]
+
+
+class CNF():
+    """
+    Clauses in conjunctive normal form, equisatisfiable with the sentences
+    added, in the integer literals used by sat.Solver.
+
+    Every compound sentence gets a variable of its own, defined by a few
+    clauses to be equivalent to it (the Tseitin encoding), so the clauses
+    grow in step with the sentences rather than exponentially as they
+    would by distributing Or over And.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.variables = {}
+        self.clauses = []
+        # Literal already defined for each sentence
+        self.literals = {}
+
+    def fresh(self):
+        self.count += 1
+        return self.count
+
+    def variable(self, name):
+        """
+        Returns the variable standing for the symbol named name.
+        """
+        if name not in self.variables:
+            self.variables[name] = self.fresh()
+        return self.variables[name]
+
+    def literal(self, sentence):
+        """
+        Returns a literal equivalent to sentence, defining it if needed.
+        """
+        literal = self.literals.get(sentence)
+        if literal is None:
+            literal = self.literals[sentence] = sentence.encode(self)
+        return literal
+
+    def add(self, sentence):
+        """
+        Adds clauses that hold exactly when sentence is true.
+        """
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.clauses.append([self.literal(disjunct)
+                                 for disjunct in sentence.disjuncts])
+        elif isinstance(sentence, Implication):
+            self.clauses.append([-self.literal(sentence.antecedent),
+                                 self.literal(sentence.consequent)])
+        else:
+            self.clauses.append([self.literal(sentence)])
+
+
+# How model_check decides entailment: "enumerate" tries every model,
+# "compiled" does so with the sentences compiled, "numpy" evaluates them
+# over a whole truth table at once, "sat" asks the SAT solver for a model
+# of knowledge and not query, and "auto" uses "numpy" if it is installed
+# up to TABLE_LIMIT symbols, otherwise "compiled" up to ENUMERATION_LIMIT,
+# and "sat" beyond
+backend = "auto"
+ENUMERATION_LIMIT = 12
+TABLE_LIMIT = 16
+
+# Truth table rows evaluated at once by the "numpy" backend, as a power of 2
+CHUNK_BITS = 16
+
+# Raised by Compiled for sentences nested too deeply for Python to parse,
+# which the "compiled" backend then leaves to "enumerate"
+COMPILE_ERRORS = (SyntaxError, MemoryError, RecursionError)
+
+
+def choose_backend(symbols):
+    """
+    Returns the backend to decide entailment over symbols with.
+    """
+    if backend != "auto":
+        return backend
+    if numpy is not None and len(symbols) <= TABLE_LIMIT:
+        return "numpy"
+    if len(symbols) <= ENUMERATION_LIMIT:
+        return "compiled"
+    return "sat"
 
 
 def model_check(knowledge, query):
     """Checks if knowledge base entails query."""
+    chosen = choose_backend(knowledge.symbols() | query.symbols())
+    return BACKENDS[chosen](knowledge, query)
+
+
+def entailed_symbols(knowledge, queries):
+    """
+    Returns the queries that knowledge base entails, in order. Unlike
+    calling model_check for each query, the models of knowledge are
+    enumerated or solved for only once, however many queries there are.
+    """
+    queries = list(queries)
+    symbols = knowledge.symbols().union(
+        *[query.symbols() for query in queries]
+    )
+    chosen = choose_backend(symbols)
+    if chosen == "enumerate":
+        return [query for query in queries
+                if enumerate_check(knowledge, query)]
+    return ENTAILMENT[chosen](knowledge, queries)
+
+
+def sat_check(knowledge, query):
+    """
+    Checks if knowledge base entails query, by showing that no model
+    makes knowledge true and query false.
+    """
+    cnf = CNF()
+    cnf.add(knowledge)
+    cnf.add(Not(query))
+    solver = Solver()
+    for clause in cnf.clauses:
+        if not solver.add_clause(clause):
+            return True
+    return not solver.solve()
+
+
+def compiled_check(knowledge, query):
+    """
+    Checks if knowledge base entails query, by compiling a counterexample
+    test and trying it on every model numbered from 0 to 2^n - 1.
+    """
+    symbols = sorted(knowledge.symbols() | query.symbols())
+    try:
+        counterexample = Compiled(And(knowledge, Not(query)), symbols)
+    except COMPILE_ERRORS:
+        return enumerate_check(knowledge, query)
+    return not any(map(counterexample.evaluate, range(2 ** len(symbols))))
+
+
+def truth_table_check(knowledge, query):
+    """
+    Checks if knowledge base entails query, by evaluating knowledge and
+    not query over every row of the truth table with NumPy, 2^CHUNK_BITS
+    rows at a time.
+    """
+    if numpy is None:
+        raise ImportError("the numpy backend needs NumPy installed")
+    symbols = sorted(knowledge.symbols() | query.symbols())
+    counterexample = And(knowledge, Not(query))
+
+    # Symbols that change within a chunk have the same columns in every
+    # chunk, and the others are constant within a chunk
+    low = min(len(symbols), CHUNK_BITS)
+    rows = numpy.arange(2 ** low, dtype=numpy.uint32)
+    columns = {name: (rows >> i & 1).astype(bool)
+               for i, name in enumerate(symbols[:low])}
+    for chunk in range(2 ** (len(symbols) - low)):
+        for i, name in enumerate(symbols[low:]):
+            columns[name] = numpy.bool_(chunk >> i & 1)
+        if numpy.any(counterexample.truth_table(columns)):
+            return False
+    return True
+
+
+def compiled_entailed(knowledge, queries):
+    """
+    Returns the queries that knowledge base entails, by collecting every
+    model numbered from 0 to 2^n - 1 in which compiled knowledge holds,
+    and keeping the queries true in all of them.
+    """
+    symbols = sorted(knowledge.symbols().union(
+        *[query.symbols() for query in queries]
+    ))
+    try:
+        holds = Compiled(knowledge, symbols).evaluate
+        tests = [Compiled(query, symbols).evaluate for query in queries]
+    except COMPILE_ERRORS:
+        return [query for query in queries
+                if enumerate_check(knowledge, query)]
+    models = [m for m in range(2 ** len(symbols)) if holds(m)]
+    return [query for query, test in zip(queries, tests)
+            if all(map(test, models))]
+
+
+def truth_table_entailed(knowledge, queries):
+    """
+    Returns the queries that knowledge base entails, by evaluating
+    knowledge over the truth table with NumPy, 2^CHUNK_BITS rows at a
+    time, and each query still possibly entailed over just the rows where
+    knowledge holds.
+    """
+    if numpy is None:
+        raise ImportError("the numpy backend needs NumPy installed")
+    symbols = sorted(knowledge.symbols().union(
+        *[query.symbols() for query in queries]
+    ))
+    entailed = dict.fromkeys(range(len(queries)), True)
+
+    low = min(len(symbols), CHUNK_BITS)
+    rows = numpy.arange(2 ** low, dtype=numpy.uint32)
+    columns = {name: (rows >> i & 1).astype(bool)
+               for i, name in enumerate(symbols[:low])}
+    for chunk in range(2 ** (len(symbols) - low)):
+        for i, name in enumerate(symbols[low:]):
+            columns[name] = numpy.bool_(chunk >> i & 1)
+        holds = numpy.broadcast_to(knowledge.truth_table(columns), rows.shape)
+        if not numpy.any(holds):
+            continue
+        # The rows of the chunk that are models of knowledge
+        models = {name: column if numpy.ndim(column) == 0 else column[holds]
+                  for name, column in columns.items()}
+        for i in list(entailed):
+            if not numpy.all(queries[i].truth_table(models)):
+                del entailed[i]
+    return [queries[i] for i in entailed]
+
+
+def sat_entailed(knowledge, queries):
+    """
+    Returns the queries that knowledge base entails, by finding which of
+    them belong to the backbone of knowledge: solve once, then for each
+    query true in every model found so far, look for a model of knowledge
+    in which it is false. Each model found rules out every query it
+    makes false, so most queries that are not entailed cost no search.
+    """
+    cnf = CNF()
+    cnf.add(knowledge)
+    literals = [cnf.literal(query) for query in queries]
+    solver = Solver()
+    for clause in cnf.clauses:
+        if not solver.add_clause(clause):
+            return list(queries)
+    # Queries may name symbols that no clause does
+    solver.ensure(cnf.count)
+    if not solver.solve():
+        return list(queries)
+
+    def ruled_out(model):
+        return {i for i in candidates
+                if model[abs(literals[i])] != (literals[i] > 0)}
+
+    candidates = set(range(len(queries)))
+    candidates -= ruled_out(solver.model)
+    entailed = set()
+    while candidates:
+        i = min(candidates)
+        candidates.remove(i)
+        if solver.solve([-literals[i]]):
+            candidates -= ruled_out(solver.model)
+        else:
+            # Knowledge implies the query, so later searches may use it
+            entailed.add(i)
+            solver.add_clause([literals[i]])
+    return [query for i, query in enumerate(queries) if i in entailed]
+
+
+def enumerate_check(knowledge, query):
+    """Checks if knowledge base entails query, by trying every model."""
 
     def check_all(knowledge, query, symbols, model):
         """Checks if knowledge base entails query, given a particular model."""
@@ -257,7 +769,22 @@ def model_check(knowledge, query):
                     check_all(knowledge, query, remaining, model_false))
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+    symbols = set(knowledge.symbols() | query.symbols())
 
     # Check that knowledge entails query
     return check_all(knowledge, query, symbols, dict())
+
+
+BACKENDS = {
+    "enumerate": enumerate_check,
+    "compiled": compiled_check,
+    "numpy": truth_table_check,
+    "sat": sat_check,
+}
+
+# entailed_symbols for each backend that answers many queries at once
+ENTAILMENT = {
+    "compiled": compiled_entailed,
+    "numpy": truth_table_entailed,
+    "sat": sat_entailed,
+}
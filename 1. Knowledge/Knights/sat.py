@@ -0,0 +1,317 @@
+"""
+Conflict-driven clause learning SAT solver.
+
+Clauses are lists of nonzero integers, where v stands for variable v
+being true and -v for it being false. The solver assigns variables by
+unit propagation over two watched literals per clause, and otherwise by
+deciding the unassigned variable most involved in recent conflicts. On
+a conflict it learns a clause that rules out its cause, found by
+resolving back to the first unique implication point, and jumps back to
+the latest decision that clause depends on.
+"""
+
+import heapq
+
+# Factor by which the activity of variables fades at every conflict
+DECAY = 0.95
+
+# Conflicts before the first restart, and the growth of the gap after each
+RESTART = 100
+RESTART_GROWTH = 1.5
+
+
+class Solver():
+
+    def __init__(self):
+        self.count = 0
+        self.clauses = []
+        # Clauses watching each literal, stored at index 2 * v + (lit < 0)
+        self.watches = [[], []]
+        # For each variable: 1 if true, -1 if false, 0 if unassigned
+        self.values = [0]
+        self.levels = [0]
+        self.reasons = [None]
+        self.phases = [-1]
+        self.activity = [0.0]
+        self.heap = []
+        self.increment = 1.0
+
+        self.trail = []
+        # Trail length at the start of each decision level
+        self.limits = []
+        self.head = 0
+
+        # False once the clauses are known to be unsatisfiable
+        self.ok = True
+        self.model = None
+        self.stats = {"decisions": 0, "propagations": 0, "conflicts": 0,
+                      "learned": 0, "restarts": 0}
+
+    def ensure(self, variable):
+        """
+        Makes room for variables up to variable.
+        """
+        while self.count < variable:
+            self.count += 1
+            self.watches.extend(([], []))
+            self.values.append(0)
+            self.levels.append(0)
+            self.reasons.append(None)
+            self.phases.append(-1)
+            self.activity.append(0.0)
+            heapq.heappush(self.heap, (0.0, self.count))
+
+    def value(self, literal):
+        """
+        Returns 1 if literal is true, -1 if false, 0 if unassigned.
+        """
+        value = self.values[abs(literal)]
+        return value if literal > 0 else -value
+
+    def add_clause(self, literals):
+        """
+        Adds a clause. Returns False if the clauses are now known to be
+        unsatisfiable.
+        """
+        self.backtrack(0)
+        if literals:
+            self.ensure(max(abs(literal) for literal in literals))
+        clause = []
+        for literal in literals:
+            if -literal in clause:
+                return self.ok
+            if literal not in clause:
+                clause.append(literal)
+        if not self.ok:
+            return False
+
+        # Drop literals already false, and clauses already true, for good
+        if any(self.value(literal) == 1 for literal in clause):
+            return True
+        clause = [literal for literal in clause if self.value(literal) == 0]
+
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self.assign(clause[0], None)
+            self.ok = self.propagate() is None
+        else:
+            self.attach(clause)
+        return self.ok
+
+    def attach(self, clause):
+        index = len(self.clauses)
+        self.clauses.append(clause)
+        self.watches[_code(clause[0])].append(index)
+        self.watches[_code(clause[1])].append(index)
+        return index
+
+    def assign(self, literal, reason):
+        variable = abs(literal)
+        self.values[variable] = 1 if literal > 0 else -1
+        self.levels[variable] = len(self.limits)
+        self.reasons[variable] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Assigns every literal forced by a clause with all its other
+        literals false. Returns the index of a clause with every literal
+        false, or None if there is none.
+        """
+        clauses = self.clauses
+        values = self.values
+        while self.head < len(self.trail):
+            false = -self.trail[self.head]
+            self.head += 1
+            self.stats["propagations"] += 1
+
+            watchers = self.watches[_code(false)]
+            kept = []
+            for position, index in enumerate(watchers):
+                clause = clauses[index]
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], clause[0]
+
+                # The clause is satisfied by its other watch
+                first = clause[0]
+                if (values[first] if first > 0 else -values[-first]) == 1:
+                    kept.append(index)
+                    continue
+
+                # Look for another literal to watch
+                for k in range(2, len(clause)):
+                    literal = clause[k]
+                    if (values[literal] if literal > 0
+                            else -values[-literal]) != -1:
+                        clause[1], clause[k] = literal, false
+                        self.watches[_code(literal)].append(index)
+                        break
+                else:
+                    kept.append(index)
+                    if (values[first] if first > 0
+                            else -values[-first]) == -1:
+                        kept.extend(watchers[position + 1:])
+                        self.watches[_code(false)] = kept
+                        return index
+                    self.assign(first, index)
+            self.watches[_code(false)] = kept
+        return None
+
+    def analyze(self, conflict):
+        """
+        Returns the clause learned from a conflict, its asserting literal
+        first, and the level to jump back to.
+        """
+        level = len(self.limits)
+        seen = set()
+        learned = [None]
+        pending = 0
+        literal = None
+        index = len(self.trail) - 1
+        clause = self.clauses[conflict]
+        while True:
+            for other in clause:
+                variable = abs(other)
+                if variable in seen or (literal is not None
+                                        and variable == abs(literal)):
+                    continue
+                if self.levels[variable] > 0:
+                    seen.add(variable)
+                    self.bump(variable)
+                    if self.levels[variable] == level:
+                        pending += 1
+                    else:
+                        learned.append(other)
+
+            # Resolve on the latest assignment at this level in the clause
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.clauses[self.reasons[abs(literal)]]
+
+        learned[0] = -literal
+        if len(learned) == 1:
+            return learned, 0
+
+        # Watch the literal of the highest remaining level second
+        deepest = max(range(1, len(learned)),
+                      key=lambda i: self.levels[abs(learned[i])])
+        learned[1], learned[deepest] = learned[deepest], learned[1]
+        return learned, self.levels[abs(learned[1])]
+
+    def bump(self, variable):
+        self.activity[variable] += self.increment
+        if self.activity[variable] > 1e100:
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.increment *= 1e-100
+            self.heap = [(-a, v) for v, a in enumerate(self.activity)
+                         if v and self.values[v] == 0]
+            heapq.heapify(self.heap)
+        elif self.values[variable] == 0:
+            heapq.heappush(self.heap,
+                           (-self.activity[variable], variable))
+
+    def backtrack(self, level):
+        """
+        Undoes every assignment made after decision level level.
+        """
+        if len(self.limits) <= level:
+            return
+        start = self.limits[level]
+        for literal in self.trail[start:]:
+            variable = abs(literal)
+            self.phases[variable] = self.values[variable]
+            self.values[variable] = 0
+            self.reasons[variable] = None
+            heapq.heappush(self.heap, (-self.activity[variable], variable))
+        del self.trail[start:]
+        del self.limits[level:]
+        self.head = len(self.trail)
+
+    def decide(self):
+        """
+        Returns the literal to decide next, or None if every variable is
+        assigned.
+        """
+        while self.heap:
+            activity, variable = heapq.heappop(self.heap)
+            if (self.values[variable] == 0
+                    and -activity == self.activity[variable]):
+                return variable if self.phases[variable] == 1 else -variable
+        for variable in range(1, self.count + 1):
+            if self.values[variable] == 0:
+                return variable if self.phases[variable] == 1 else -variable
+        return None
+
+    def solve(self, assumptions=()):
+        """
+        Returns True if the clauses can all be satisfied with every
+        literal in assumptions true. If so, self.model holds the value
+        of every variable, indexed by variable, as True or False.
+        """
+        self.model = None
+        if not self.ok:
+            return False
+        self.backtrack(0)
+        for literal in assumptions:
+            self.ensure(abs(literal))
+        if self.propagate() is not None:
+            self.ok = False
+            return False
+
+        restart = RESTART
+        conflicts = 0
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.stats["conflicts"] += 1
+                conflicts += 1
+                if not self.limits:
+                    self.ok = False
+                    return False
+                learned, level = self.analyze(conflict)
+                self.backtrack(level)
+                if len(learned) == 1:
+                    self.assign(learned[0], None)
+                else:
+                    self.stats["learned"] += 1
+                    self.assign(learned[0], self.attach(learned))
+                self.increment /= DECAY
+                continue
+
+            if conflicts >= restart:
+                self.stats["restarts"] += 1
+                conflicts = 0
+                restart *= RESTART_GROWTH
+                self.backtrack(0)
+                continue
+
+            # Assumptions are each decided at a level of their own
+            if len(self.limits) < len(assumptions):
+                literal = assumptions[len(self.limits)]
+                value = self.value(literal)
+                if value == -1:
+                    self.backtrack(0)
+                    return False
+                self.limits.append(len(self.trail))
+                if value == 0:
+                    self.assign(literal, None)
+                continue
+
+            literal = self.decide()
+            if literal is None:
+                self.model = [value == 1 for value in self.values]
+                self.backtrack(0)
+                return True
+            self.stats["decisions"] += 1
+            self.limits.append(len(self.trail))
+            self.assign(literal, None)
+
+
+def _code(literal):
+    return 2 * literal if literal > 0 else -2 * literal + 1